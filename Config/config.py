@@ -64,6 +64,10 @@ NGINX_BASE_DIR = os.path.join(os.getcwd(), "nginx")
 NGINX_STREAM_DIR = os.path.join(os.getcwd(), "nginx", "data", "nginx", "stream")
 SQLITE_DB_PATH = os.path.join(os.getcwd(), "nginx", "data", "database.sqlite")
 
+# NPM admin UI address, probed to know when the container is ready to serve
+NPM_ADMIN_HOST = os.environ.get("NPM_ADMIN_HOST", "127.0.0.1")
+NPM_ADMIN_PORT = int(os.environ.get("NPM_ADMIN_PORT", 81))
+
 # Load the WebSocket token using the token manager from Core
 WS_TOKEN = token_manager.load_ws_token()
 
@@ -72,6 +76,15 @@ WS_SERVER_PORT = int(
     os.environ.get("WS_SERVER_PORT", 8765)
 )  # Default port 8765, configurable via environment
 
+# Seconds between sweeps that remove disconnected WebSocket clients
+WS_CLEANUP_INTERVAL = int(os.environ.get("WS_CLEANUP_INTERVAL", 120))
+
+# Log the status of every client on each cleanup sweep (verbose, off by default)
+DEBUG_WS_CLEANUP = os.environ.get("DEBUG_WS_CLEANUP", "").lower() == "true"
+
+# Log every received WebSocket message (disable with WS_LOG_MESSAGES=false on busy servers)
+WS_LOG_MESSAGES = os.environ.get("WS_LOG_MESSAGES", "true").lower() == "true"
+
 # File paths for port and client assignment tracking
 ASSIGNED_PORTS_FILE = "assigned_ports.json"
 CONNECTED_CLIENTS_FILE = "connected_clients.json"
@@ -20,6 +20,7 @@ from ports import ports_utils as pu
 from npm import npm_handler as npm
 from npm import docker_utils
 from ports import ports_handler
+from Streams import stream_db_handler
 from UI.console_handler import (
     console_handler,
     ws_info,
@@ -97,6 +98,13 @@ async def main():
     else:
         ws_warning("WS_SERVER", "Skipping NPM check (SKIP_NPM_CHECK=true)")
 
+    # Serve NPM status checks from a 'docker events' subscription instead of polling
+    if not skip_npm:
+        npm.start_status_watcher()
+
+    # Make sure the stream lookups done by the handler are index-backed
+    stream_db_handler.ensure_stream_indexes()
+
     # Check if port is available
     ws_info("WS_SERVER", f"Checking if port {cfg.WS_SERVER_PORT} is available...")
 
@@ -233,7 +241,13 @@ async def main():
     try:
         ws_info("WS_SERVER", "Initializing WebSocket server...")
 
-        # Start the WebSocket server with compatible settings
+        # wg0 may have been brought up or reconfigured since the last start
+        # (e.g. the server restarted from the menu): drop the cached WG IP
+        ports_handler.invalidate_wg_ip_cache()
+
+        # Start the WebSocket server with compatible settings.
+        # Clients only send small JSON control messages, so per-message deflate is
+        # disabled (compression=None) to avoid zlib work on every frame.
         server = await websockets.serve(
             ports_handler.handler,
             "0.0.0.0",
@@ -242,7 +256,7 @@ async def main():
             ping_timeout=30,
             close_timeout=10,
             max_size=2**20,
-            max_queue=32,
+            max_queue=64,
             compression=None,
         )
 
@@ -263,11 +277,14 @@ async def main():
         ws_info("WS_SERVER", "Server accessible via:", connection_info)
         ws_info("WS_SERVER", "Press Ctrl+C to stop the server")
 
-        # Start periodic cleanup task
+        # Schedule periodic cleanup of disconnected clients
         ws_info("WS_SERVER", "Starting periodic cleanup task...")
-        # Asegúrate que docker_utils.periodic_cleanup() NO reinicie NPM ni los contenedores
-        cleanup_task = asyncio.create_task(docker_utils.periodic_cleanup())
-        ws_success("WS_SERVER", "Periodic cleanup task started")
+        # Asegúrate que la limpieza periódica NO reinicie NPM ni los contenedores
+        docker_utils.schedule_cleanup()
+        ws_success(
+            "WS_SERVER",
+            f"Periodic cleanup scheduled every {cfg.WS_CLEANUP_INTERVAL} seconds",
+        )
 
         # Keep the server running indefinitely
         ws_success("WS_SERVER", "Server is now running and waiting for connections...")
@@ -387,7 +404,7 @@ async def main():
 
             # Wait for either the server to close or manual interruption
             done, pending = await asyncio.wait(
-                [server_task, heartbeat_task, cleanup_task],
+                [server_task, heartbeat_task],
                 return_when=asyncio.FIRST_COMPLETED,
             )
 
@@ -404,11 +421,8 @@ async def main():
             ws_error("WS_SERVER", f"Server error: {e}")
         finally:
             ws_info("WS_SERVER", "Cleaning up server resources...")
-            cleanup_task.cancel()
-            try:
-                await cleanup_task
-            except asyncio.CancelledError:
-                pass
+            docker_utils.cancel_cleanup()
+            npm.stop_status_watcher()
             ws_warning("WS_SERVER", "Server shutdown completed")
         return True
 
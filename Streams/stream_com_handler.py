@@ -1,3 +1,4 @@
+import functools
 import os
 import sqlite3
 from rich.console import Console
@@ -10,6 +11,42 @@ from UI.console_handler import ws_error, ws_info, ws_warning
 
 console = Console()
 
+# Ports per "IN (...)" query, below SQLite's historical limit of 999 bound parameters
+MAX_SQL_VARIABLES = 900
+
+
+@functools.lru_cache(maxsize=32)
+def protocol_group(protocol):
+    """
+    Returns "tcp", "udp", or "any" (both protocols) for a requested protocol.
+    Cached: clients only ever send a handful of distinct protocol strings.
+    """
+    protocol = protocol.lower()
+    return protocol if protocol in ("tcp", "udp") else "any"
+
+
+def port_key(port):
+    """
+    Returns the port as SQLite reports it back: numeric strings are compared as
+    integers against the INTEGER port columns.
+    """
+    if isinstance(port, str) and port.strip().isdigit():
+        return int(port)
+    return port
+
+
+# Single-port lookups, one fixed statement per protocol group
+_SQL_STREAM_FOR_CLIENT = {
+    "tcp": "SELECT id FROM stream WHERE incoming_port=? AND tcp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
+    "udp": "SELECT id FROM stream WHERE incoming_port=? AND udp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
+    "any": "SELECT id FROM stream WHERE incoming_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND forwarding_host=?",
+}
+_SQL_CONFLICT_RESOLUTION = {
+    "tcp": "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND tcp_forwarding=1 AND is_deleted=0 AND incoming_port!=forwarding_port",
+    "udp": "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND udp_forwarding=1 AND is_deleted=0 AND incoming_port!=forwarding_port",
+    "any": "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND incoming_port!=forwarding_port",
+}
+
 
 def check_if_stream_exists_for_client(incoming_port, protocol, client_ip):
     """
@@ -25,21 +62,10 @@ def check_if_stream_exists_for_client(incoming_port, protocol, client_ip):
         cur = conn.cursor()
 
         # Query depending on the protocol (TCP/UDP)
-        if protocol.lower() == "tcp":
-            cur.execute(
-                "SELECT id FROM stream WHERE incoming_port=? AND tcp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
-                (incoming_port, client_ip),
-            )
-        elif protocol.lower() == "udp":
-            cur.execute(
-                "SELECT id FROM stream WHERE incoming_port=? AND udp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
-                (incoming_port, client_ip),
-            )
-        else:
-            cur.execute(
-                "SELECT id FROM stream WHERE incoming_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND forwarding_host=?",
-                (incoming_port, client_ip),
-            )
+        cur.execute(
+            _SQL_STREAM_FOR_CLIENT[protocol_group(protocol)],
+            (incoming_port, client_ip),
+        )
 
         result = cur.fetchone()
         return result[0] if result else None
@@ -51,10 +77,11 @@ def check_if_stream_exists_for_client(incoming_port, protocol, client_ip):
         conn.close()
 
 
-def get_next_available_ports(conflict_ports, count_needed):
+def get_next_available_ports(conflict_ports, count_needed, reserved_ports=()):
     """
     Gets alternative ports for conflicting ports.
-    Searches in a predefined range and avoids already used ports.
+    Searches in a predefined range and avoids already used ports, plus
+    'reserved_ports' (ports about to be used that are not in the database yet).
     """
     # Check if the database file exists
     if not os.path.exists(cfg.SQLITE_DB_PATH):
@@ -77,6 +104,7 @@ def get_next_available_ports(conflict_ports, count_needed):
             used_ports.add(row[0])
     finally:
         conn.close()
+    used_ports.update(port_key(port) for port in reserved_ports)
 
     ws_info("[STREAM_MANAGER]", f"Found {len(used_ports)} ports already in use")
 
@@ -124,21 +152,10 @@ def check_existing_conflict_resolution(client_ip, original_port, protocol):
 
         # Look for existing conflict resolution stream for this client
         # A conflict resolution stream has incoming_port != forwarding_port
-        if protocol.lower() == "tcp":
-            cur.execute(
-                "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND tcp_forwarding=1 AND is_deleted=0 AND incoming_port!=forwarding_port",
-                (client_ip, original_port),
-            )
-        elif protocol.lower() == "udp":
-            cur.execute(
-                "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND udp_forwarding=1 AND is_deleted=0 AND incoming_port!=forwarding_port",
-                (client_ip, original_port),
-            )
-        else:
-            cur.execute(
-                "SELECT incoming_port, id FROM stream WHERE forwarding_host=? AND forwarding_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND incoming_port!=forwarding_port",
-                (client_ip, original_port),
-            )
+        cur.execute(
+            _SQL_CONFLICT_RESOLUTION[protocol_group(protocol)],
+            (client_ip, original_port),
+        )
 
         result = cur.fetchone()
         return result if result else None
@@ -78,11 +78,12 @@ def remove_inactive_ports_from_streams():
         json.dump(new_data, f, indent=2)
 
 
-def add_streams_sqlite_with_ip_extended(new_entries):
+def add_streams_sqlite_with_ip_extended(new_entries, sync=True):
     """
     Adds multiple streams to the SQLite database with explicit IP handling.
-    Groups by port and updates or inserts as appropriate.
+    Groups by port and updates or inserts as appropriate, in a single transaction.
     Applies WireGuard logic if available.
+    Syncs the .conf files afterwards unless sync=False (the caller syncs them itself).
     """
     if not new_entries:
         return
@@ -298,7 +299,7 @@ def add_streams_sqlite_with_ip_extended(new_entries):
         conn.close()
 
         # Sincronizar archivos .conf después de agregar streams
-        if summary_rows:
+        if summary_rows and sync:
             from Streams import stream_creation_db
 
             ws_info("[STREAM_MANAGER]", "Synchronizing NGINX configuration files...")
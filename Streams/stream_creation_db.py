@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sqlite3
 import json
@@ -10,15 +11,16 @@ console = Console()
 # Add parent directory to sys.path to import config
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Config import config as cfg
-from npm.npm_handler import reload_npm
+from npm.npm_handler import reload_npm, reload_npm_async
 from UI.console_handler import ws_error, ws_info, ws_warning
 
 
 # Main function to synchronize NGINX stream config files with the current SQLite database
-def sync_streams_conf_with_sqlite():
+def sync_streams_conf_with_sqlite(reload=True):
     """
     Synchronizes NGINX stream configuration files with the current SQLite database.
     Generates .conf files for each active stream.
+    Reloads NGINX afterwards unless reload=False (the caller reloads it itself).
     """
 
     # Reads active streams from the SQLite database and returns a list of dictionaries with stream data
@@ -209,4 +211,52 @@ def sync_streams_conf_with_sqlite():
         ws_warning("[STREAM_MANAGER]", "No active streams to synchronize.")
 
     # Reload NGINX using the existing function from npm_handler
-    reload_npm()
+    if reload:
+        reload_npm()
+
+
+# Segundos de espera sin nuevos cambios antes de sincronizar y recargar NPM
+NPM_RELOAD_DEBOUNCE = 0.5
+_reload_state = {"loop": None, "event": None, "task": None}
+
+
+def request_npm_reload():
+    """
+    Solicita sincronizar los .conf y recargar NPM. Las peticiones que llegan en ráfaga
+    se agrupan en una sola recarga tras NPM_RELOAD_DEBOUNCE segundos sin cambios.
+    Debe llamarse desde el event loop.
+    """
+    loop = asyncio.get_running_loop()
+    if _reload_state["loop"] is not loop:
+        # Nuevo event loop (p.ej. el servidor se reinició desde el menú)
+        _reload_state["loop"] = loop
+        _reload_state["event"] = asyncio.Event()
+        _reload_state["task"] = None
+    _reload_state["event"].set()
+    task = _reload_state["task"]
+    if task is None or task.done():
+        _reload_state["task"] = loop.create_task(_npm_reload_worker())
+
+
+async def _npm_reload_worker():
+    """
+    Tarea en segundo plano que ejecuta las recargas de NPM agrupadas.
+    """
+    event = _reload_state["event"]
+    while True:
+        await event.wait()
+        await asyncio.sleep(NPM_RELOAD_DEBOUNCE)
+        event.clear()
+        try:
+            await _sync_and_reload_npm()
+        except Exception as e:
+            ws_error("[WS]", f"Error reloading NPM: {e}")
+
+
+async def _sync_and_reload_npm():
+    """
+    Regenera los .conf de streams desde SQLite (en un hilo) y recarga Nginx en el
+    contenedor de NPM sin bloquear el event loop. Una sola recarga por pasada.
+    """
+    await asyncio.to_thread(sync_streams_conf_with_sqlite, False)
+    await reload_npm_async()
@@ -9,6 +9,20 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from UI.console_handler import ws_info, ws_error, ws_warning
 
 
+def db_file_identity(path=None):
+    """
+    Returns (st_dev, st_ino) of the SQLite database file, or None if it does not exist.
+    Cached connections compare it to notice the database was deleted and recreated
+    (e.g. after the NPM data directory is removed), since they keep reading the
+    unlinked file otherwise.
+    """
+    try:
+        st = os.stat(path or cfg.SQLITE_DB_PATH)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
 def clean_streams_database():
     """
     Removes all streams from the SQLite database robustly.
@@ -113,3 +127,63 @@ def delete_stream(stream_id):
     except Exception as e:
         ws_error("[WS]", f"Error deleting stream ID {stream_id}: {e}")
         return False
+
+
+# Covering partial index for the live-stream lookups by incoming_port (the conflict
+# checks and the WebSocket handler). is_deleted is kept as a trailing column, and the
+# rowid (stream id) is implicit in every index, so SQLite answers
+# "WHERE is_deleted=0 AND incoming_port IN (...)" from the index alone.
+STREAM_INCOMING_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_stream_incoming_cover ON stream(incoming_port, "
+    "forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding, is_deleted) "
+    "WHERE is_deleted=0"
+)
+
+# Partial index over the conflict-resolution streams (incoming_port != forwarding_port).
+# Used by the conflict cleaner UPDATE and the conflict summary queries.
+STREAM_CONFLICT_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_stream_conflict ON stream(id) "
+    "WHERE incoming_port != forwarding_port AND is_deleted=0"
+)
+
+# Covering partial index for the conflict lookups by forwarding_port/forwarding_host.
+# is_deleted is kept as a trailing column so SQLite can answer them from the index alone.
+STREAM_FORWARDING_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_stream_forwarding ON stream(forwarding_port, "
+    "forwarding_host, incoming_port, tcp_forwarding, udp_forwarding, is_deleted) "
+    "WHERE is_deleted=0"
+)
+
+
+def ensure_stream_indexes():
+    """
+    Creates the partial indexes used by the WebSocket server lookups and the conflict
+    cleanup on the 'stream' table.
+    The handler always filters live rows (is_deleted=0) by incoming_port, so a partial
+    covering index turns those lookups into index-only B-tree searches.
+    Safe to call on every startup.
+    """
+    try:
+        if not os.path.exists(cfg.SQLITE_DB_PATH):
+            ws_info("[WS]", "SQLite database not found - skipping stream indexes")
+            return False
+        conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='stream'"
+            )
+            if not cur.fetchone():
+                ws_warning("[WS]", "Table 'stream' does not exist in the database")
+                return False
+            cur.execute(STREAM_INCOMING_INDEX_SQL)
+            cur.execute(STREAM_CONFLICT_INDEX_SQL)
+            cur.execute(STREAM_FORWARDING_INDEX_SQL)
+            conn.commit()
+            ws_info("[WS]", "Stream lookup indexes verified")
+            return True
+        finally:
+            conn.close()
+    except Exception as e:
+        ws_error("[WS]", f"Error creating stream indexes: {e}")
+        return False
@@ -6,6 +6,14 @@ import dotenv
 
 dotenv.load_dotenv()
 
+# Use uvloop's libuv-based event loop for the WebSocket server/client when available
+try:
+    import uvloop
+
+    uvloop.install()
+except ImportError:
+    pass
+
 # Add the parent directory to sys.path to allow importing modules from parent folders
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
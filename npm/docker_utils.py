@@ -1,89 +1,120 @@
+import asyncio
 import datetime
-import subprocess
 import os
-from rich.console import Console
-
-console = Console()
+import shutil
+import subprocess
 import time
-import asyncio
-import sys
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Config import config as cfg
-from npm import npm_handler as npmh
-from npm import npm_status as npmst
-from ports import conflict_handler as ch
 from UI.console_handler import ws_info, ws_error, ws_warning
 
+# npm_handler, npm_status and conflict_handler are imported inside the functions
+# that need them, so importing this module for the availability checks stays cheap.
+
 # This module provides utility functions to check Docker availability
 # and set an environment variable accordingly.
 
 
-# Copied
-async def periodic_cleanup():
+# Handle of the next scheduled cleanup sweep (None when not scheduled)
+_cleanup_handle = None
+
+
+def schedule_cleanup(loop=None):
     """
-    Periodic cleanup task to remove disconnected clients.
+    Schedules the periodic cleanup of disconnected clients on the event loop.
+    Each sweep re-arms itself with loop.call_later every cfg.WS_CLEANUP_INTERVAL seconds,
+    so no task sits permanently in the scheduler. Call cancel_cleanup() to stop it.
     """
-    while True:
-        try:
-            await asyncio.sleep(120)  # Increased from 60 to 120 seconds to reduce load
+    global _cleanup_handle
+    if loop is None:
+        loop = asyncio.get_running_loop()
+    _cleanup_handle = loop.call_later(cfg.WS_CLEANUP_INTERVAL, _run_cleanup, loop)
+    return _cleanup_handle
+
+
+def cancel_cleanup():
+    """
+    Cancels the scheduled periodic cleanup, if any.
+    """
+    global _cleanup_handle
+    if _cleanup_handle is not None:
+        _cleanup_handle.cancel()
+        _cleanup_handle = None
+
+
+def _run_cleanup(loop):
+    """
+    Runs one cleanup sweep (skipped when there are no clients) and re-arms the timer.
+    """
+    try:
+        if cfg.connected_clients:
             cleanup_disconnected_clients()
-        except Exception as e:
-            ws_error("[WS]", f"Error in periodic cleanup: {e}")
+    except Exception as e:
+        ws_error("[WS]", f"Error in periodic cleanup: {e}")
+    finally:
+        if _cleanup_handle is not None:
+            schedule_cleanup(loop)
+
+
+# Cached availability results. These almost never change during the process
+# lifetime, so each check only resolves the binaries the first time it runs.
+_docker_available = None
+_docker_compose_available = None
+
+
+def _binary_available(name):
+    """
+    Returns True if 'name' resolves to an executable file on PATH.
+    Only PATH lookups are done: no subprocess is started.
+    """
+    path = shutil.which(name)
+    return bool(path and os.access(path, os.X_OK))
+
+
+def _export_flag(name, available):
+    """
+    Publishes an availability flag in os.environ (read by menus and child processes).
+    The environment is only written when the value actually changes.
+    """
+    want = "1" if available else "0"
+    if os.environ.get(name) != want:
+        os.environ[name] = want
 
 
 def check_docker_available():
     """
     Checks if Docker is available on the system and sets the environment variable DOCKER_AVAILABLE.
     Returns True if Docker is available, False otherwise.
+    The probe result is cached for the lifetime of the process.
     """
-    try:
-        # Try to run 'docker --version' to check if Docker is installed and accessible
-        result = subprocess.run(
-            ["docker", "--version"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=5,
-        )
-        if result.returncode == 0:
-            # Docker is available, set environment variable to "1"
-            os.environ["DOCKER_AVAILABLE"] = "1"
-            return True
-        else:
-            # Docker command failed, set environment variable to "0"
-            os.environ["DOCKER_AVAILABLE"] = "0"
-            return False
-    except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
-        # Exception occurred (timeout, not found, or other), set environment variable to "0"
-        os.environ["DOCKER_AVAILABLE"] = "0"
-        return False
+    global _docker_available
+    if _docker_available is None:
+        # Look up the docker binary on PATH instead of running 'docker --version'
+        _docker_available = _binary_available("docker")
+    _export_flag("DOCKER_AVAILABLE", _docker_available)
+    return _docker_available
 
 
 def check_docker_compose_available():
     """
     Checks if Docker Compose is available on the system and sets the environment variable DOCKER_COMPOSE_AVAILABLE.
+    Accepts either the standalone docker-compose binary or the 'docker compose' plugin.
     Returns True if Docker Compose is available, False otherwise.
+    The probe result is cached for the lifetime of the process.
     """
-    try:
-        # Try to run 'docker-compose --version' to check if Docker Compose is installed and accessible
-        result = subprocess.run(
-            ["docker-compose", "--version"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=5,
-        )
-        if result.returncode == 0:
-            # Docker Compose is available, set environment variable to "1"
-            os.environ["DOCKER_COMPOSE_AVAILABLE"] = "1"
-            return True
+    global _docker_compose_available
+    if _docker_compose_available is None:
+        if _binary_available("docker-compose"):
+            _docker_compose_available = True
         else:
-            # Docker Compose command failed, set environment variable to "0"
-            os.environ["DOCKER_COMPOSE_AVAILABLE"] = "0"
-            return False
-    except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
-        # Exception occurred (timeout, not found, or other), set environment variable to "0"
-        os.environ["DOCKER_COMPOSE_AVAILABLE"] = "0"
-        return False
+            # The plugin form needs one 'docker compose version' run (cached by npm_handler)
+            from npm import npm_handler as npmh
+
+            _docker_compose_available = _binary_available("docker") and (
+                npmh.compose_command() == ["docker", "compose"]
+            )
+    _export_flag("DOCKER_COMPOSE_AVAILABLE", _docker_compose_available)
+    return _docker_compose_available
 
 
 def stop_running_docker_containers():
@@ -92,10 +123,17 @@ def stop_running_docker_containers():
     Returns True if successful, False otherwise.
     """
     try:
-        # Run 'docker stop $(docker ps -q)' to stop all running containers
-        subprocess.run(
-            ["docker", "stop", "$(docker", "ps", "-q)"], shell=True, check=True
-        )
+        # List running container IDs once, then stop them all with a single 'docker stop'
+        container_ids = subprocess.check_output(
+            ["docker", "ps", "-q"], stderr=subprocess.DEVNULL, timeout=15
+        ).split()
+        if container_ids:
+            subprocess.run(
+                ["docker", "stop", *[cid.decode() for cid in container_ids]],
+                stdout=subprocess.DEVNULL,
+                check=True,
+                timeout=60,
+            )
         return True
     except subprocess.CalledProcessError:
         return False
@@ -104,11 +142,28 @@ def stop_running_docker_containers():
         return False
 
 
+# Maximum seconds to wait for NPM to become ready after starting it
+NPM_START_TIMEOUT = 25
+
+
+def _wait_for_npm(timeout):
+    """
+    Waits until the NPM admin port accepts TCP connections or the timeout expires.
+    Returns True if NPM became ready.
+    """
+    from npm import npm_handler as npmh
+
+    return npmh.wait_for_npm_ready(timeout)
+
+
 def check_and_start_npm():
     """
     Check NPM status and optionally try to start it if not running.
     Uses existing NPM_Cleaner functions to avoid code duplication.
     """
+    from npm import npm_handler as npmh
+    from npm import npm_status as npmst
+
     ws_info("[WS]", "Checking NPM container status...")
 
     try:
@@ -126,28 +181,13 @@ def check_and_start_npm():
             npmh.restart_npm()
             ws_info("[WS]", "NPM container start command executed")
 
-            # Wait a moment for NPM to initialize
+            # Poll until NPM is ready instead of sleeping a fixed time
             ws_info("[WS]", "Waiting for NPM to initialize...")
-            time.sleep(10)
-
-            # Check again
-            npm_status = npmst.check_npm()
-            if npm_status:
+            if _wait_for_npm(NPM_START_TIMEOUT):
                 ws_info("[WS]", "NPM is now running and accessible")
                 return True
-            else:
-                ws_warning(
-                    "[WS]", "NPM started but not yet accessible, waiting longer..."
-                )
-                # Give it more time
-                time.sleep(15)
-                npm_status = npmst.check_npm()
-                if npm_status:
-                    ws_info("[WS]", "NPM is now accessible")
-                    return True
-                else:
-                    ws_error("[WS]", "NPM still not accessible after waiting")
-                    return False
+            ws_error("[WS]", "NPM still not accessible after waiting")
+            return False
         except Exception as e:
             ws_error("[WS]", f"Error starting NPM: {e}")
             return False
@@ -156,6 +196,18 @@ def check_and_start_npm():
         return False
 
 
+def _format_ts(ts):
+    """
+    Formats a UNIX timestamp for the cleanup debug log.
+    """
+    if not ts:
+        return "N/A"
+    try:
+        return datetime.datetime.fromtimestamp(ts).strftime("%d/%m/%Y %I:%M:%S %p")
+    except Exception:
+        return str(ts)
+
+
 def cleanup_disconnected_clients():
     """
     Remove clients that are no longer connected or haven't been seen recently.
@@ -163,8 +215,16 @@ def cleanup_disconnected_clients():
     current_time = time.time()
     timeout = 300  # 5 minutes
 
+    # Only format timestamps when per-client debug logging is enabled
+    debug = cfg.DEBUG_WS_CLEANUP
+    if debug:
+        now_fmt = _format_ts(current_time)
+
+    # Shallow dict copy: cheaper than materializing (key, value) tuples, and safe
+    # against handlers adding/removing clients while we scan
+    snapshot = cfg.connected_clients.copy()
     disconnected = []
-    for client_id, info in list(cfg.connected_clients.items()):
+    for client_id, info in snapshot.items():
         try:
             ws = info.get("ws")
             last_seen = info.get("last_seen", 0)
@@ -182,37 +242,23 @@ def cleanup_disconnected_clients():
             except Exception:
                 ws_closed = True  # Assume closed if we can't check
 
-            # Format last_seen and current_time
-            try:
-                last_seen_fmt = (
-                    datetime.datetime.fromtimestamp(last_seen).strftime(
-                        "%d/%m/%Y %I:%M:%S %p"
-                    )
-                    if last_seen
-                    else "N/A"
-                )
-                now_fmt = datetime.datetime.fromtimestamp(current_time).strftime(
-                    "%d/%m/%Y %I:%M:%S %p"
-                )
-            except Exception:
-                last_seen_fmt = str(last_seen)
-                now_fmt = str(current_time)
-
             # Debug: Log client status
-            ws_info(
-                "[WS]",
-                f"Checking client {client_id}: ws_closed={ws_closed}, last_seen={last_seen_fmt}, now={now_fmt}",
-            )
+            if debug:
+                ws_info(
+                    "[WS]",
+                    f"Checking client {client_id}: ws_closed={ws_closed}, last_seen={_format_ts(last_seen)}, now={now_fmt}",
+                )
 
             # Check if websocket is closed or client hasn't been seen recently
             if ws_closed or (current_time - last_seen > timeout):
                 disconnected.append(client_id)
-                del cfg.connected_clients[client_id]
         except Exception as e:
             ws_warning("[WS]", f"Error checking client {client_id}: {e}")
             disconnected.append(client_id)
-            if client_id in cfg.connected_clients:
-                del cfg.connected_clients[client_id]
+
+    # Remove all disconnected clients in a single pass after the scan
+    for client_id in disconnected:
+        cfg.connected_clients.pop(client_id, None)
 
     if disconnected:
         ws_warning(
@@ -221,4 +267,6 @@ def cleanup_disconnected_clients():
         )
 
         # Reassign ports after cleanup
-        asyncio.create_task(ch.notify_clients_of_conflicts_and_assignments())
+        from ports import conflict_handler as ch
+
+        ch.schedule_conflict_notification()
@@ -1,34 +1,33 @@
 import os
-import re
+import queue
 import shutil
+import stat
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from rich.progress import Progress
 
 # This module provides utilities for working with git repositories,
 # specifically cloning a repository with a progress bar using 'rich'.
 
 
-def check_git_available():
+# Cached result of the git availability probe (None = not probed yet)
+_git_available = None
+
+
+def check_git_available(refresh=False):
     """
     Checks if git is available on the system.
     Returns True if git is available, False otherwise.
+    The probe result is cached; pass refresh=True to run it again.
     """
-    try:
-        # Try to run 'git --version' to check if git is installed and accessible
-        result = subprocess.run(
-            ["git", "--version"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            timeout=5,
-        )
-        if result.returncode == 0:
-            # Git is available
-            return True
-        else:
-            # Git command failed
-            return False
-    except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
-        return False
+    global _git_available
+    if _git_available is None or refresh:
+        # Look up the git binary on PATH instead of running 'git --version'
+        path = shutil.which("git")
+        _git_available = bool(path and os.access(path, os.X_OK))
+    return _git_available
 
 
 def fix_permissions(path, uid=None, gid=None):
@@ -57,15 +56,73 @@ def fix_permissions(path, uid=None, gid=None):
         gid = get_gid_safe()
     # Solo ejecutar chown si uid/gid son válidos (no None)
     if uid is not None and gid is not None:
-        for root, dirs, files in os.walk(path):
-            for momo in dirs:
-                os.chown(os.path.join(root, momo), uid, gid)
-            for momo in files:
-                os.chown(os.path.join(root, momo), uid, gid)
+        # os.chown libera el GIL, así que las llamadas se reparten en un pool de hilos
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(lambda p: os.chown(p, uid, gid), _walk_paths(path)):
+                pass
         os.chown(path, uid, gid)
 
 
-def repo_clone(repo_url, destino):
+def _walk_paths(path):
+    """
+    Genera recursivamente las rutas de todos los archivos y carpetas bajo 'path'
+    usando os.scandir (sin seguir enlaces simbólicos).
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            yield entry.path
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_paths(entry.path)
+
+
+# Marker of the git progress lines used to drive the progress bar
+_RECEIVING_MARKER = b"Receiving objects"
+
+
+def _parse_percent(line):
+    """
+    Returns the integer percentage preceding the last '%' in a git progress line
+    (bytes), or None if there is none. Scans backwards instead of using a regex.
+    """
+    pct_end = line.rfind(b"%")
+    i = pct_end - 1
+    while i >= 0 and 0x30 <= line[i] <= 0x39:
+        i -= 1
+    if pct_end <= 0 or i == pct_end - 1:
+        return None
+    return int(line[i + 1 : pct_end])
+
+
+# Minimum time between progress bar renders (~20 Hz)
+_RENDER_INTERVAL = 0.05
+
+
+def _pipe_reader(pipe, chunks):
+    """
+    Reads raw chunks from a pipe in a background thread and pushes them onto 'chunks'.
+    An empty bytes object is pushed at EOF.
+    """
+    fd = pipe.fileno()
+    try:
+        while True:
+            chunk = os.read(fd, 65536)
+            chunks.put(chunk)
+            if not chunk:
+                break
+    except OSError:
+        chunks.put(b"")
+
+
+def _chmod_and_retry(func, path, exc_info):
+    """
+    shutil.rmtree error handler: makes the path writable and retries the operation.
+    """
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def repo_clone(repo_url, destino, shallow=True):
     """
     Clones a git repository showing a progress bar.
     Removes the destination if it already exists before cloning.
@@ -73,34 +130,65 @@ def repo_clone(repo_url, destino):
     Args:
         repo_url (str): URL of the git repository to clone.
         destino (str): Path where the repository will be cloned.
-        console: Rich console object (not used in this function).
+        shallow (bool): Clone only the latest commit (--depth 1). Defaults to True.
     """
-    # Clone the repository with progress bar
-    if os.path.exists(destino):
-        # Remove the destination directory if it already exists
-        shutil.rmtree(destino)
+    # Remove the destination if it already exists. An empty directory (e.g. first
+    # run) is removed with a single rmdir; otherwise fall back to a full rmtree
+    # that clears read-only flags (git objects on Windows) and retries.
+    try:
+        os.rmdir(destino)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        shutil.rmtree(destino, onerror=_chmod_and_retry)
+    # Only the working tree is needed by default, so skip the history
+    depth_args = ["--depth", "1"] if shallow else []
     with Progress() as progress:
         # Add a new task to the progress bar for cloning
         task = progress.add_task("[cyan]Cloning AMPTemplates repository...", total=100)
-        # Use subprocess to clone and show simulated progress
+        # Use subprocess to clone and show simulated progress.
+        # stderr is read unbuffered in binary mode: git rewrites its progress
+        # line with '\r', so chunks are split on both '\r' and '\n'.
         process = subprocess.Popen(
-            ["git", "clone", "--progress", repo_url, destino],
-            stdout=subprocess.PIPE,
+            ["git", "clone", "--progress", *depth_args, repo_url, destino],
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.PIPE,
-            universal_newlines=True,
-            bufsize=1,
+            bufsize=0,
         )
         percent = 0
-        # Read lines from stderr to parse git progress output
+        pending = b""
         if process.stderr is not None:
-            for line in process.stderr:
-                if "Receiving objects" in line:
-                    # Extract percentage from line using regular expressions
-                    match = re.search(r"(\d+)%", line)
-                    if match:
-                        percent = int(match.group(1))
-                        # Update progress bar with current percentage
-                        progress.update(task, completed=percent)
+            # A reader thread drains the pipe so git never stalls on a full stderr,
+            # while this thread parses chunks and renders at a bounded rate.
+            chunks = queue.SimpleQueue()
+            threading.Thread(
+                target=_pipe_reader, args=(process.stderr, chunks), daemon=True
+            ).start()
+            rendered = 0
+            next_render = time.monotonic()
+            eof = False
+            while not eof:
+                try:
+                    chunk = chunks.get(timeout=_RENDER_INTERVAL)
+                except queue.Empty:
+                    chunk = None
+                if chunk == b"":
+                    eof = True
+                elif chunk:
+                    lines = (pending + chunk).replace(b"\r", b"\n").split(b"\n")
+                    # The last element may be an incomplete line; keep it for the next chunk
+                    pending = lines.pop()
+                    for line in lines:
+                        if _RECEIVING_MARKER in line:
+                            new_percent = _parse_percent(line)
+                            if new_percent is not None:
+                                percent = new_percent
+                now = time.monotonic()
+                # Only re-render when the value changed and the frame interval elapsed
+                if percent != rendered and now >= next_render:
+                    progress.update(task, completed=percent)
+                    rendered = percent
+                    next_render = now + _RENDER_INTERVAL
         process.wait()
         # Make sure progress bar reaches 100% at the end
         progress.update(task, completed=100)
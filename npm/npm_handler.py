@@ -9,33 +9,171 @@ Functions:
 - stop_npm: Stops the NPM container if it is running.
 - restart_npm: Restarts the NPM container.
 - reload_npm: Reloads Nginx inside the running NPM container.
-- restart_npm_for_fresh_start: Performs a clean restart of NPM, stopping and removing containers before starting again.
+- reload_npm_async: Async version of reload_npm for the WebSocket server's event loop.
+- restart_npm_for_fresh_start: Performs a clean restart of NPM: 'restart' when its containers are running,
+  'up -d --force-recreate --remove-orphans' when stopped leftovers remain, or 'up -d' when nothing runs.
 """
 
+import asyncio
+import functools
 import os
+import socket
 import subprocess
+import tempfile
 import time
 
 from rich.console import Console
 from Config import config as cfg
+from npm import status_watcher
 from UI.console_handler import ws_info, ws_error, ws_warning
 
+try:
+    # Optional: the Docker SDK talks to the daemon socket directly, without forking a CLI
+    import docker
+except ImportError:
+    docker = None
+
 console = Console()
 
+# Cached Docker SDK client and compose command (resolved once per process)
+_docker_client = None
+_compose_cmd = None
 
-def ensure_npm_compose_file():
+# Background 'docker events' watcher for the NPM project (None until started)
+_status_watcher = None
+
+# Cached name of the running NPM container, reused by reload_npm for a short while
+NPM_IMAGE = "jc21/nginx-proxy-manager"
+# Service name of NPM in the generated docker-compose.yml
+NPM_COMPOSE_SERVICE = "app"
+NPM_CONTAINER_CACHE_TTL = 60
+_npm_container_cache = {"name": None, "ts": 0.0}
+
+
+def _get_docker_client():
     """
-    Ensures that the docker-compose.yml file for Nginx Proxy Manager exists.
-    If it does not exist, it creates one with the default configuration.
+    Returns a cached Docker SDK client, or None if the SDK is not installed
+    or the daemon cannot be reached.
     """
-    npm_dir = cfg.NGINX_BASE_DIR
-    compose_file = os.path.join(npm_dir, "docker-compose.yml")
-    if not os.path.exists(npm_dir):
-        os.makedirs(npm_dir)
-    if not os.path.exists(compose_file):
-        with open(compose_file, "w") as f:
-            f.write(
-                """services:
+    global _docker_client
+    if docker is None:
+        return None
+    if _docker_client is None:
+        try:
+            _docker_client = docker.from_env()
+        except Exception:
+            return None
+    return _docker_client
+
+
+def compose_command():
+    """
+    Returns the compose command to use as a list: ["docker", "compose"] when the
+    v2 plugin (Go binary, fast startup) is available, ["docker-compose"] otherwise.
+    The probe runs only once per process.
+    """
+    global _compose_cmd
+    if _compose_cmd is None:
+        try:
+            result = subprocess.run(
+                ["docker", "compose", "version"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=5,
+            )
+            v2_available = result.returncode == 0
+        except Exception:
+            v2_available = False
+        _compose_cmd = ["docker", "compose"] if v2_available else ["docker-compose"]
+    return _compose_cmd
+
+
+def _compose_project_name(compose_dir):
+    """
+    Returns the default compose project name for a directory (its normalized basename).
+    """
+    name = os.path.basename(os.path.normpath(compose_dir)).lower()
+    return "".join(c for c in name if c.isalnum() or c in "-_")
+
+
+def _compose_services(compose_dir, status, timeout=10):
+    """
+    Returns the service names of the containers of the compose project in compose_dir
+    that are in the given Docker status ("running", "exited", ...).
+    Queries the Docker daemon through the SDK when installed, otherwise through a
+    single 'docker ps' with a label filter (no docker-compose process is started).
+    """
+    label = f"com.docker.compose.project={_compose_project_name(compose_dir)}"
+    client = _get_docker_client()
+    if client is not None:
+        try:
+            containers = client.containers.list(
+                all=True, filters={"label": label, "status": status}
+            )
+            return [
+                c.labels.get("com.docker.compose.service", c.name) for c in containers
+            ]
+        except Exception:
+            pass  # Fall back to the CLI below
+    result = subprocess.run(
+        [
+            "docker",
+            "ps",
+            "-a",
+            "--filter",
+            f"label={label}",
+            "--filter",
+            f"status={status}",
+            "--format",
+            '{{.Label "com.docker.compose.service"}}',
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        timeout=timeout,
+    )
+    # Output is read as bytes; only the few service names are decoded
+    return [line.decode() for line in result.stdout.split()]
+
+
+def running_compose_services(compose_dir, timeout=10):
+    """
+    Returns the names of the running services of the compose project in compose_dir.
+    Answered from the 'docker events' watcher when it is active for that project.
+    """
+    watcher = _status_watcher
+    if watcher is not None and watcher.project == _compose_project_name(compose_dir):
+        services = watcher.running_services()
+        if services is not None:
+            return services
+    return _compose_services(compose_dir, "running", timeout)
+
+
+def start_status_watcher():
+    """
+    Starts the background 'docker events' watcher for the NPM compose project, so
+    later status checks are served from memory. Returns True if it is running.
+    """
+    global _status_watcher
+    compose_dir = cfg.NGINX_BASE_DIR
+    if _status_watcher is None:
+        _status_watcher = status_watcher.ComposeStatusWatcher(
+            _compose_project_name(compose_dir)
+        )
+    return _status_watcher.start(
+        lambda: _compose_services(compose_dir, "running", timeout=10)
+    )
+
+
+def stop_status_watcher():
+    """
+    Stops the background 'docker events' watcher, if any.
+    """
+    if _status_watcher is not None:
+        _status_watcher.stop()
+
+
+# Default docker-compose.yml for Nginx Proxy Manager, kept as bytes so it is written as-is
+_COMPOSE_YAML = b"""services:
   app:
     image: 'jc21/nginx-proxy-manager:latest'
     restart: unless-stopped
@@ -48,8 +186,79 @@ def ensure_npm_compose_file():
       DISABLE_IPV6: 'true'
       X_FRAME_OPTIONS: "sameorigin"
 """
-            )
-    ws_info("[CONTROL_PANEL]", f"docker-compose.yml generated at {compose_file}")
+
+
+@functools.lru_cache(maxsize=1)
+def compose_file_path():
+    """
+    Returns the path of the NPM docker-compose.yml (joined once per process).
+    """
+    return os.path.join(cfg.NGINX_BASE_DIR, "docker-compose.yml")
+
+
+def ensure_npm_compose_file():
+    """
+    Ensures that the docker-compose.yml file for Nginx Proxy Manager exists.
+    If it does not exist, it creates one with the default configuration.
+    """
+    npm_dir = cfg.NGINX_BASE_DIR
+    compose_file = compose_file_path()
+    # Checked on every call: the menu can delete the NPM directory mid-run.
+    # An existing file is never rewritten (it may carry user changes).
+    if os.path.exists(compose_file):
+        return
+    os.makedirs(npm_dir, exist_ok=True)
+    if _publish_compose_file(npm_dir, compose_file):
+        ws_info("[CONTROL_PANEL]", f"docker-compose.yml generated at {compose_file}")
+
+
+def _publish_compose_file(npm_dir, compose_file):
+    """
+    Writes the default docker-compose.yml to a temporary file and publishes it with
+    os.link, which fails if the target already exists: a crash mid-write never leaves
+    a truncated file behind, and a concurrent writer never overwrites an existing one.
+    Returns True if this call wrote the file.
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=npm_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_COMPOSE_YAML)
+        try:
+            os.link(tmp_file, compose_file)
+        except FileExistsError:
+            return False
+        except OSError:
+            # No hard links on this filesystem: exclusive create instead
+            try:
+                with open(compose_file, "xb") as f:
+                    f.write(_COMPOSE_YAML)
+            except FileExistsError:
+                return False
+        return True
+    finally:
+        os.unlink(tmp_file)
+
+
+def wait_for_port(host, port, timeout):
+    """
+    Waits until a TCP connection to host:port is accepted or the timeout expires.
+    Returns True as soon as the port accepts connections, False on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.settimeout(0.5)
+            if s.connect_ex((host, port)) == 0:
+                return True
+        time.sleep(0.1)
+    return False
+
+
+def wait_for_npm_ready(timeout=30):
+    """
+    Waits for the NPM admin UI (cfg.NPM_ADMIN_HOST:cfg.NPM_ADMIN_PORT) to accept connections.
+    """
+    return wait_for_port(cfg.NPM_ADMIN_HOST, cfg.NPM_ADMIN_PORT, timeout)
 
 
 def stop_npm():
@@ -59,7 +268,7 @@ def stop_npm():
     """
     # Check if docker-compose.yml exists
     compose_dir = cfg.NGINX_BASE_DIR
-    compose_file = os.path.join(compose_dir, "docker-compose.yml")
+    compose_file = compose_file_path()
     if not os.path.exists(compose_file):
         ws_warning(
             "[NPM_CLEANER]",
@@ -68,14 +277,7 @@ def stop_npm():
         return
     # Check if the container is running before attempting to stop it
     try:
-        result = subprocess.run(
-            ["docker-compose", "ps", "--services", "--filter", "status=running"],
-            cwd=compose_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        running_services = result.stdout.strip().splitlines()
+        running_services = running_compose_services(compose_dir)
         if not running_services:
             ws_info(
                 "[NPM_CLEANER]",
@@ -86,7 +288,8 @@ def stop_npm():
         ws_error("[NPM_CLEANER]", f"Error checking running containers: {e}")
         return
     try:
-        subprocess.run(["docker-compose", "down"], cwd=compose_dir, check=True)
+        subprocess.run([*compose_command(), "down"], cwd=compose_dir, check=True)
+        invalidate_npm_container_cache()
         ws_info("[NPM_CLEANER]", "Container stopped.")
     except subprocess.CalledProcessError as e:
         ws_error(
@@ -101,7 +304,7 @@ def restart_npm():
     """
     ws_info("[NPM_CLEANER]", "Restarting Nginx Proxy Manager with docker-compose...")
     compose_dir = cfg.NGINX_BASE_DIR
-    compose_file = os.path.join(compose_dir, "docker-compose.yml")
+    compose_file = compose_file_path()
     if not os.path.exists(compose_file):
         ws_warning(
             "[NPM_CLEANER]",
@@ -109,9 +312,16 @@ def restart_npm():
         )
         return
     try:
-        subprocess.run(["docker-compose", "down"], cwd=compose_dir, check=True)
-        subprocess.run(["docker-compose", "up", "-d"], cwd=compose_dir, check=True)
+        # A running container only needs 'restart' (no recreate); otherwise start it
+        if running_compose_services(compose_dir):
+            restart_cmd, timeout = [*compose_command(), "restart"], 30
+        else:
+            restart_cmd, timeout = [*compose_command(), "up", "-d"], 60
+        subprocess.run(restart_cmd, cwd=compose_dir, check=True, timeout=timeout)
+        invalidate_npm_container_cache()
         ws_info("[NPM_CLEANER]", "Container restarted.")
+    except subprocess.TimeoutExpired:
+        ws_error("[NPM_CLEANER]", "Timeout while restarting NPM")
     except subprocess.CalledProcessError as e:
         ws_error(
             "[NPM_CLEANER]",
@@ -119,38 +329,169 @@ def restart_npm():
         )
 
 
-def reload_npm():
+def _find_npm_container():
     """
-    Reloads Nginx inside the Nginx Proxy Manager container using nginx -s reload.
-    Only runs if Docker is available.
+    Returns the name of the running NPM container, or None if there is none.
+    The name is cached for NPM_CONTAINER_CACHE_TTL seconds so consecutive reloads
+    skip the container enumeration.
+    """
+    now = time.monotonic()
+    if (
+        _npm_container_cache["name"]
+        and now - _npm_container_cache["ts"] < NPM_CONTAINER_CACHE_TTL
+    ):
+        return _npm_container_cache["name"]
+
+    # Matched by the compose labels of the 'app' service, which survive an image pull;
+    # an 'ancestor' filter resolves to the current image ID and misses a container
+    # still running the previous one
+    labels = [
+        f"com.docker.compose.project={_compose_project_name(cfg.NGINX_BASE_DIR)}",
+        f"com.docker.compose.service={NPM_COMPOSE_SERVICE}",
+    ]
+    name = None
+    client = _get_docker_client()
+    if client is not None:
+        try:
+            containers = client.containers.list(filters={"label": labels})
+            if not containers:
+                # NPM not started from our compose file: match the image name instead
+                containers = [
+                    c
+                    for c in client.containers.list()
+                    if NPM_IMAGE in c.attrs.get("Config", {}).get("Image", "")
+                ]
+            if containers:
+                name = containers[0].name
+        except Exception:
+            client = None  # Fall back to the CLI below
+    if client is None:
+        # Let the daemon filter by label; only the matching names come back
+        result = subprocess.run(
+            [
+                "docker",
+                "ps",
+                "--filter",
+                f"label={labels[0]}",
+                "--filter",
+                f"label={labels[1]}",
+                "--filter",
+                "status=running",
+                "--format",
+                "{{.Names}}",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=10,
+        )
+        names = result.stdout.split()
+        if names:
+            name = names[0].decode()
+        else:
+            # NPM not started from our compose file: match the image name instead
+            result = subprocess.run(
+                ["docker", "ps", "--format", "{{.Image}} {{.Names}}"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=10,
+            )
+            for line in result.stdout.decode(errors="replace").splitlines():
+                parts = line.split()
+                if len(parts) >= 2 and NPM_IMAGE in parts[0]:
+                    name = parts[1]
+                    break
+
+    _npm_container_cache["name"] = name
+    _npm_container_cache["ts"] = now
+    return name
+
+
+def invalidate_npm_container_cache():
+    """
+    Forgets the cached NPM container name (e.g. after the container is recreated).
+    """
+    _npm_container_cache["name"] = None
+    _npm_container_cache["ts"] = 0.0
+
+
+def _exec_nginx_reload(container_name):
+    """
+    Runs 'nginx -s reload' inside the given container.
+    Uses the Docker SDK client when available (no process is forked), otherwise 'docker exec'.
+    Returns a (returncode, stdout, stderr) tuple.
+    """
+    client = _get_docker_client()
+    if client is not None:
+        try:
+            container = client.containers.get(container_name)
+            exit_code, (out, err) = container.exec_run(
+                ["nginx", "-s", "reload"], demux=True
+            )
+            return (
+                exit_code,
+                (out or b"").decode(errors="replace"),
+                (err or b"").decode(errors="replace"),
+            )
+        except docker.errors.NotFound as e:
+            return 1, "", str(e)
+        except Exception:
+            pass  # Fall back to the CLI below
+    result = subprocess.run(
+        ["docker", "exec", container_name, "nginx", "-s", "reload"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode == 0:
+        return 0, "", ""
+    # Output is only shown on failure, so it is only decoded then
+    return (
+        result.returncode,
+        result.stdout.decode(errors="replace"),
+        result.stderr.decode(errors="replace"),
+    )
+
+
+def _docker_available_for_reload():
+    """
+    Returns True if Docker is available, warning when the reload has to be skipped.
     """
-    # Asegura que la variable DOCKER_AVAILABLE esté correctamente definida
+    # Usa el resultado cacheado de la comprobación de Docker (solo lanza 'docker --version' la primera vez)
     try:
         from npm.docker_utils import check_docker_available
 
-        check_docker_available()
+        docker_available = check_docker_available()
     except Exception as e:
         ws_error("[NPM_CLEANER]", f"Error checking Docker availability: {e}")
+        docker_available = os.environ.get("DOCKER_AVAILABLE", "0") == "1"
 
-    docker_available = os.environ.get("DOCKER_AVAILABLE", "0") == "1"
     if not docker_available:
         ws_warning("[NPM_CLEANER]", "Docker not available - skipping NPM reload")
+    return docker_available
+
+
+def _report_reload(returncode, stdout, stderr):
+    """
+    Logs the outcome of an 'nginx -s reload' run.
+    """
+    if returncode == 0:
+        ws_info("[NPM_CLEANER]", "Nginx reloaded successfully inside the NPM container.")
+    else:
+        ws_warning(
+            "[NPM_CLEANER]",
+            f"Warning reloading Nginx:\nSTDOUT:\n{stdout}\nSTDERR:\n{stderr}",
+        )
+
+
+def reload_npm():
+    """
+    Reloads Nginx inside the Nginx Proxy Manager container using nginx -s reload.
+    Only runs if Docker is available.
+    """
+    if not _docker_available_for_reload():
         return
 
-    npm_container_name = None
     try:
-        # Find the running NPM container ID or name
-        result = subprocess.run(
-            ["docker", "ps", "--format", "{{.ID}} {{.Image}} {{.Names}}"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        for line in result.stdout.splitlines():
-            parts = line.strip().split()
-            if len(parts) >= 3 and "jc21/nginx-proxy-manager" in parts[1]:
-                npm_container_name = parts[2]
-                break
+        npm_container_name = _find_npm_container()
         if not npm_container_name:
             ws_warning(
                 "[NPM_CLEANER]",
@@ -158,21 +499,14 @@ def reload_npm():
             )
             return
         # Execute nginx -s reload inside the container
-        exec_result = subprocess.run(
-            ["docker", "exec", npm_container_name, "nginx", "-s", "reload"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        if exec_result.returncode == 0:
-            ws_info(
-                "[NPM_CLEANER]", "Nginx reloaded successfully inside the NPM container."
-            )
-        else:
-            ws_warning(
-                "[NPM_CLEANER]",
-                f"Warning reloading Nginx:\nSTDOUT:\n{exec_result.stdout}\nSTDERR:\n{exec_result.stderr}",
-            )
+        returncode, stdout, stderr = _exec_nginx_reload(npm_container_name)
+        if returncode != 0:
+            # The cached container may have been recreated: resolve it again and retry once
+            invalidate_npm_container_cache()
+            fresh_name = _find_npm_container()
+            if fresh_name and fresh_name != npm_container_name:
+                returncode, stdout, stderr = _exec_nginx_reload(fresh_name)
+        _report_reload(returncode, stdout, stderr)
     except Exception as e:
         ws_warning(
             "[NPM_CLEANER]",
@@ -183,14 +517,14 @@ def reload_npm():
 def restart_npm_for_fresh_start():
     """
     Performs a fresh restart of the NPM container to ensure a clean start when launching ws_server.
-    Stops and removes previous containers before starting again.
+    Restarts running containers (recreating them if stopped leftovers exist) or starts them.
     """
     ws_info(
         "[NPM_CLEANER]",
         "Performing fresh restart of NPM for WebSocket server startup...",
     )
     compose_dir = cfg.NGINX_BASE_DIR
-    compose_file = os.path.join(compose_dir, "docker-compose.yml")
+    compose_file = compose_file_path()
 
     if not os.path.exists(compose_file):
         ws_warning(
@@ -201,43 +535,34 @@ def restart_npm_for_fresh_start():
 
     try:
         # First check if any containers are running
-        result = subprocess.run(
-            ["docker-compose", "ps", "--services", "--filter", "status=running"],
-            cwd=compose_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=10,
-        )
-
-        running_services = result.stdout.strip().splitlines()
+        running_services = running_compose_services(compose_dir, timeout=10)
 
+        start_cmd, timeout = [*compose_command(), "up", "-d"], 60
         if running_services:
             ws_info(
                 "[NPM_CLEANER]",
                 f"Found {len(running_services)} running service(s). Performing clean restart...",
             )
-            # Force stop and remove containers
-            subprocess.run(
-                ["docker-compose", "down", "--remove-orphans"],
-                cwd=compose_dir,
-                check=True,
-                timeout=30,
-            )
-            ws_info("[NPM_CLEANER]", "NPM containers stopped successfully")
-            time.sleep(2)  # Brief pause between stop and start
+            if _compose_services(compose_dir, "exited", timeout=10):
+                # Leftover stopped containers: recreate and remove orphans in one invocation
+                start_cmd += ["--force-recreate", "--remove-orphans"]
+            else:
+                start_cmd, timeout = [*compose_command(), "restart"], 30
         else:
             ws_info("[NPM_CLEANER]", "No running containers found. Starting fresh...")
 
         # Start containers
-        result = subprocess.run(
-            ["docker-compose", "up", "-d"], cwd=compose_dir, check=True, timeout=60
-        )
+        subprocess.run(start_cmd, cwd=compose_dir, check=True, timeout=timeout)
+        invalidate_npm_container_cache()
         ws_info("[NPM_CLEANER]", "NPM containers started successfully")
 
-        # Wait a moment for services to initialize
+        # Wait until the admin UI accepts connections instead of a fixed pause
         ws_info("[NPM_CLEANER]", "Waiting for NPM to initialize...")
-        time.sleep(5)
+        if not wait_for_npm_ready():
+            ws_warning(
+                "[NPM_CLEANER]",
+                f"NPM did not accept connections on port {cfg.NPM_ADMIN_PORT} yet",
+            )
 
         return True
 
@@ -257,3 +582,79 @@ def restart_npm_for_fresh_start():
     except Exception as e:
         ws_warning("[NPM_CLEANER]", f"Unexpected error during NPM restart: {e}")
         return False
+
+
+# ---------------------------------------------------------------------------------
+# Async variant of the NPM reload for callers running on the asyncio event loop
+# (WebSocket server). Docker commands run through asyncio.create_subprocess_exec,
+# so the loop keeps serving clients while exec runs. The sync functions above
+# remain for the menu and the worker threads.
+# ---------------------------------------------------------------------------------
+
+
+async def _run_async(cmd, cwd=None, timeout=None):
+    """
+    Runs a command without blocking the event loop.
+    Returns (returncode, stdout, stderr) with the output decoded.
+    Raises subprocess.TimeoutExpired if it does not finish within 'timeout' seconds.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    return (
+        proc.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace"),
+    )
+
+
+async def _exec_nginx_reload_async(container_name):
+    """
+    Async version of _exec_nginx_reload().
+    """
+    if _get_docker_client() is not None:
+        # The SDK call is a blocking HTTP request: keep it off the event loop
+        return await asyncio.to_thread(_exec_nginx_reload, container_name)
+    return await _run_async(
+        ["docker", "exec", container_name, "nginx", "-s", "reload"], timeout=30
+    )
+
+
+async def reload_npm_async():
+    """
+    Async version of reload_npm().
+    """
+    if not _docker_available_for_reload():
+        return
+
+    try:
+        npm_container_name = await asyncio.to_thread(_find_npm_container)
+        if not npm_container_name:
+            ws_warning(
+                "[NPM_CLEANER]",
+                "Could not find a running Nginx Proxy Manager container to reload.",
+            )
+            return
+        returncode, stdout, stderr = await _exec_nginx_reload_async(npm_container_name)
+        if returncode != 0:
+            # The cached container may have been recreated: resolve it again and retry once
+            invalidate_npm_container_cache()
+            fresh_name = await asyncio.to_thread(_find_npm_container)
+            if fresh_name and fresh_name != npm_container_name:
+                returncode, stdout, stderr = await _exec_nginx_reload_async(fresh_name)
+        _report_reload(returncode, stdout, stderr)
+    except Exception as e:
+        ws_warning(
+            "[NPM_CLEANER]",
+            f"Warning reloading Nginx in NPM container (Docker may not be available): {e}",
+        )
+
@@ -1,5 +1,6 @@
+import functools
 import shutil
-import subprocess
+import time
 from rich.console import Console
 import os
 import sys
@@ -13,14 +14,25 @@ from UI.console_handler import ws_info, ws_error, ws_warning
 console = Console()
 
 
+@functools.lru_cache(maxsize=1)
+def _docker_compose_path():
+    """
+    Returns the compose executable in use: the 'docker' binary when the 'docker compose'
+    v2 plugin is available, otherwise the docker-compose binary (or None).
+    Resolved only once per process.
+    """
+    if npmh.compose_command() == ["docker", "compose"]:
+        return shutil.which("docker")
+    return shutil.which("docker-compose")
+
+
 def check_npm_install():
     """
-    Checks if Nginx Proxy Manager is installed and running.
-    If not installed, attempts to create the docker-compose.yml file.
-    Displays the current status of the service.
+    Checks that docker compose is installed, which Nginx Proxy Manager needs.
+    Returns True if it is available, False otherwise (and reports the error).
     """
     # Check if docker-compose is installed
-    if not shutil.which("docker-compose"):
+    if not _docker_compose_path():
         ws_error(
             "[NPM_INSTALL]",
             "docker-compose is not installed. Nginx Proxy Manager cannot be verified.",
@@ -29,25 +41,32 @@ def check_npm_install():
     return True
 
 
+# Short-lived cache of the last check_npm() answer, so status checks made in
+# quick succession (e.g. one UI refresh) query Docker only once
+CHECK_NPM_TTL = 2.0
+_check_npm_cache = {"ts": 0.0, "value": False}
+
 def check_npm():
     """
     Checks if Nginx Proxy Manager is installed and running.
     If not installed, attempts to create the docker-compose.yml file.
     Displays the current status of the service.
+    Results are reused for CHECK_NPM_TTL seconds.
     """
-    # Check if docker-compose is installed
-    if not shutil.which("docker-compose"):
-        ws_error(
-            "[NPM_INSTALL]",
-            "docker-compose is not installed. Nginx Proxy Manager cannot be verified.",
-        )
-        return False
+    now = time.monotonic()
+    if _check_npm_cache["ts"] and now - _check_npm_cache["ts"] < CHECK_NPM_TTL:
+        return _check_npm_cache["value"]
+    value = _check_npm_uncached()
+    _check_npm_cache["ts"] = time.monotonic()
+    _check_npm_cache["value"] = value
+    return value
 
-    npm_dir = cfg.NGINX_BASE_DIR
-    compose_file = os.path.join(npm_dir, "docker-compose.yml")
 
-    # Check if docker-compose.yml exists in the NPM directory
-    if not os.path.exists(compose_file):
+def _check_compose_file():
+    """
+    Creates the docker-compose.yml for NPM if it does not exist yet.
+    """
+    if not os.path.exists(npmh.compose_file_path()):
         ws_warning(
             "[NPM_INSTALL]",
             "docker-compose.yml not found in ./npm. Nginx Proxy Manager is not installed.",
@@ -58,19 +77,24 @@ def check_npm():
             "docker-compose.yml created. Please start Nginx Proxy Manager with 'docker-compose up -d' in the ./npm directory.",
         )
 
+
+def _check_npm_uncached():
+    """
+    Performs the actual check_npm() work.
+    """
+    npm_dir = cfg.NGINX_BASE_DIR
+    # Check if docker-compose is installed (the compose lookup is cached); the
+    # compose file is checked every time, since the menu can delete it mid-run
+    if not check_npm_install():
+        return False
+    _check_compose_file()
+
     try:
         ws_info("[NPM_INSTALL]", "Checking the status of Nginx Proxy Manager...")
-        result = subprocess.run(
-            ["docker-compose", "ps", "--services", "--filter", "status=running"],
-            cwd=npm_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-        ws_info(
-            "[NPM_INSTALL]", f"Result of docker-compose ps:\n{result.stdout.strip()}"
-        )
-        running_services = result.stdout.strip().splitlines()
+        # One 'docker ps' filtered by compose project label instead of 'docker-compose ps'
+        running_services = npmh.running_compose_services(npm_dir)
+        services_list = "\n".join(running_services)
+        ws_info("[NPM_INSTALL]", f"Running services:\n{services_list}")
 
         if running_services:
             ws_info("[NPM_INSTALL]", "Nginx Proxy Manager is running.")
@@ -0,0 +1,104 @@
+import subprocess
+import threading
+
+# This module keeps an in-memory view of which services of a docker compose
+# project are running, fed by a single long-lived 'docker events' process.
+# Status queries become a set lookup instead of a new 'docker ps' per poll.
+
+# Docker events that mean a container is (no longer) running
+_START_EVENTS = frozenset({"start", "unpause"})
+# ('kill' is left out: 'docker kill -s HUP' only signals the container, and every
+# real stop also produces 'die')
+_STOP_EVENTS = frozenset({"die", "stop", "pause", "destroy"})
+
+
+class ComposeStatusWatcher:
+    """
+    Tracks the running services of one compose project from 'docker events'.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self._running = set()
+        self._lock = threading.Lock()
+        self._process = None
+        self._thread = None
+
+    def start(self, seed):
+        """
+        Starts the 'docker events' subscription and seeds the state with 'seed()',
+        a callable returning the currently running service names.
+        The subscription is opened before seeding so no event is missed in between.
+        Returns True if the watcher is running.
+        """
+        if self.is_alive():
+            return True
+        try:
+            self._process = subprocess.Popen(
+                [
+                    "docker",
+                    "events",
+                    "--filter",
+                    "type=container",
+                    "--filter",
+                    f"label=com.docker.compose.project={self.project}",
+                    "--format",
+                    '{{.Action}} {{index .Actor.Attributes "com.docker.compose.service"}}',
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except (FileNotFoundError, OSError):
+            self._process = None
+            return False
+        try:
+            initial = seed()
+        except Exception:
+            self.stop()
+            return False
+        with self._lock:
+            self._running = set(initial)
+        self._thread = threading.Thread(target=self._read_events, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """
+        Terminates the 'docker events' process; the reader thread then exits.
+        """
+        process = self._process
+        self._process = None
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def is_alive(self):
+        """
+        Returns True while the 'docker events' process is running.
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def running_services(self):
+        """
+        Returns the running service names, or None if the watcher is not active
+        (callers then query Docker directly).
+        """
+        if not self.is_alive():
+            return None
+        with self._lock:
+            return list(self._running)
+
+    def _read_events(self):
+        process = self._process
+        if process is None or process.stdout is None:
+            return
+        for line in process.stdout:
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            action = parts[0].decode()
+            service = parts[1].decode()
+            with self._lock:
+                if action in _START_EVENTS:
+                    self._running.add(service)
+                elif action in _STOP_EVENTS:
+                    self._running.discard(service)
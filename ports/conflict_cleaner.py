@@ -4,10 +4,10 @@
 # It is intended to help maintain a clean state by removing records and files
 # related to port conflicts in streaming configurations.
 
-import json
 import os
 import sys
 import sqlite3
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,10 +16,35 @@ from rich.console import Console
 # Add the parent directory to sys.path to allow importing the config module
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Config import config as cfg
-from UI.console_handler import ws_info, ws_error, ws_warning
+from Streams import stream_db_handler as sdb
+from UI.console_handler import ws_info, ws_error
 
 console = Console()
 
+# One SQLite connection per thread, reused across clears while the database file
+# is the same one it was opened on
+_tls = threading.local()
+
+
+def _conn():
+    """
+    Returns this thread's cached SQLite connection, opening it (WAL, NORMAL sync) on first use.
+    The connection is reopened if the database file was replaced since it was opened.
+    Runs in autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE.
+    """
+    identity = sdb.db_file_identity()
+    conn = getattr(_tls, "conn", None)
+    if conn is not None and _tls.identity != identity:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = sqlite3.connect(cfg.SQLITE_DB_PATH, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _tls.conn = conn
+        _tls.identity = sdb.db_file_identity()
+    return conn
+
 
 # Copied
 def clear_all_conflict_resolution_data():
@@ -31,42 +56,50 @@ def clear_all_conflict_resolution_data():
 
     cleared_count = 0
 
-    # Iterate over all conflict files defined in the config and remove them if they exist
+    # Remove all conflict files defined in the config; a missing file is simply skipped
+    # (one unlink per file, no separate existence check)
+    cleared_files = []
     for file_path in cfg.CONFLICT_FILES:
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                cleared_count += 1
-                ws_info("[STREAM_MANAGER]", f"Cleared: {file_path}")
+            os.remove(file_path)
+        except FileNotFoundError:
+            continue
         except Exception as e:
             ws_error("[STREAM_MANAGER]", f"Error clearing {file_path}: {e}")
+            continue
+        cleared_files.append(file_path)
+    cleared_count += len(cleared_files)
+    # One log call for all cleared files instead of one per file
+    if cleared_files:
+        ws_info("[STREAM_MANAGER]", f"Cleared: {', '.join(cleared_files)}")
 
     # Clear conflict resolution streams from the database
     try:
         if os.path.exists(cfg.SQLITE_DB_PATH):
-            conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
-            try:
-                cur = conn.cursor()
+            conn = _conn()
+            cur = conn.cursor()
+            # Idempotent: lets the UPDATE below scan only the conflict rows
+            cur.execute(sdb.STREAM_CONFLICT_INDEX_SQL)
 
-                # Find and remove conflict resolution streams (where incoming_port != forwarding_port)
+            # Remove conflict resolution streams (where incoming_port != forwarding_port)
+            # in a single pass; rowcount gives the number of streams cleared
+            cur.execute("BEGIN IMMEDIATE")
+            try:
                 cur.execute(
-                    "SELECT COUNT(*) FROM stream WHERE incoming_port != forwarding_port AND is_deleted=0"
+                    "UPDATE stream SET is_deleted=1, enabled=0 WHERE incoming_port != forwarding_port AND is_deleted=0"
+                )
+                conflict_streams = cur.rowcount
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+            if conflict_streams > 0:
+                cleared_count += conflict_streams
+                ws_info(
+                    "[STREAM_MANAGER]",
+                    f"Cleared {conflict_streams} conflict resolution streams from database",
                 )
-                conflict_streams = cur.fetchone()[0]
-
-                if conflict_streams > 0:
-                    cur.execute(
-                        "UPDATE stream SET is_deleted=1, enabled=0 WHERE incoming_port != forwarding_port AND is_deleted=0"
-                    )
-                    conn.commit()
-                    cleared_count += conflict_streams
-                    ws_info(
-                        "[STREAM_MANAGER]",
-                        f"Cleared {conflict_streams} conflict resolution streams from database",
-                    )
-
-            finally:
-                conn.close()
     except Exception as e:
         ws_error(
             "[STREAM_MANAGER]", f"Error clearing database conflict resolutions: {e}"
@@ -76,15 +109,26 @@ def clear_all_conflict_resolution_data():
     return cleared_count
 
 
+# Serialized empty port list (json.dumps([]) is always "[]")
+_EMPTY_PORTS = b"[]"
+
+
 # Copied
 def clear_ws_ports_file():
     """
     Clears the WebSocket ports file by writing an empty list to it.
-    Uses a lock to ensure thread safety.
+    The content is written to a temporary file outside the lock; only the atomic
+    os.replace runs under the lock, so readers never see a half-written file.
     """
-    with cfg.ws_ports_lock:
+    tmp_file = f"{cfg.WS_PORTS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(_EMPTY_PORTS)
+        with cfg.ws_ports_lock:
+            os.replace(tmp_file, cfg.WS_PORTS_FILE)
+    except Exception as e:
+        ws_error("[WS]", f"Error clearing ws_ports file: {e}")
         try:
-            with open(cfg.WS_PORTS_FILE, "w") as f:
-                json.dump([], f)
-        except Exception as e:
-            ws_error("[WS]", f"Error clearing ws_ports file: {e}")
+            os.remove(tmp_file)
+        except OSError:
+            pass
@@ -18,22 +18,160 @@ Dependencies:
 - Uses the 'rich' library for console output.
 """
 
+import asyncio
+import atexit
+from contextlib import contextmanager
+import functools
 import json
 import logging
 import os
+import queue
 from rich.console import Console
 import sqlite3
 import sys
+import threading
+import time
+from urllib.request import pathname2url
 
 # Add parent directory to sys.path to allow relative imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Config import config as cfg
 from ports import conflict_resolution as cf_res
+from Streams import stream_db_handler as sdb
 from UI.console_handler import ws_info, ws_error, ws_warning
 
 console = Console()
 
+# Coalescing of assignment/conflict broadcasts: at most one run per NOTIFY_MIN_INTERVAL
+# seconds, and the event loop is yielded every BROADCAST_BATCH_SIZE clients.
+NOTIFY_MIN_INTERVAL = 5
+BROADCAST_BATCH_SIZE = 50
+_notify_state = {"task": None, "last_ts": 0.0, "fingerprint": None}
+
+# Pool of read-only SQLite connections for the conflict queries, filled on first use.
+# Each query borrows its own connection, so reads from different threads run in parallel.
+# The pool is rebuilt when the database file is replaced ("identity" is its dev/inode).
+READ_POOL_SIZE = 4
+_read_pool_state = {"pool": None, "identity": None}
+_read_pool_lock = threading.Lock()
+
+
+# Fixed query strings, so SQLite's statement cache can reuse the compiled statements
+_SQL_CONFLICT_INFO = (
+    "SELECT incoming_port, forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding "
+    "FROM stream WHERE is_deleted=0 AND incoming_port != forwarding_port"
+)
+_SQL_FIND_BY_IPS = (
+    "SELECT incoming_port, forwarding_host, tcp_forwarding, udp_forwarding FROM stream "
+    "WHERE forwarding_port=? AND is_deleted=0 AND incoming_port!=forwarding_port "
+    "AND forwarding_host IN ({placeholders})"
+)
+
+
+# Protocol names of a stream indexed by (tcp_forwarding << 1) | udp_forwarding
+_PROTO_TABLE = ((), ("UDP",), ("TCP",), ("TCP", "UDP"))
+
+
+@functools.lru_cache(maxsize=32)
+def _sql_find_by_ips(ip_count):
+    """
+    Returns the multi-IP lookup query for 'ip_count' IPs (one string per count).
+    """
+    return _SQL_FIND_BY_IPS.format(placeholders=",".join("?" * ip_count))
+
+
+def _open_read_conn():
+    """
+    Opens one read-only connection (SQLite URI with mode=ro) tuned for lookups.
+    """
+    uri = f"file:{pathname2url(os.path.abspath(cfg.SQLITE_DB_PATH))}?mode=ro"
+    conn = sqlite3.connect(
+        uri,
+        uri=True,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=256,
+    )
+    # Wait for writers instead of failing with 'database is locked'
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-16000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Memory-mapped reads (up to 256 MB) avoid a read() syscall per page
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def _drain_read_pool(pool):
+    """
+    Closes the idle connections of a pool. Connections still borrowed from it are
+    closed when they are garbage collected after being returned.
+    """
+    while True:
+        try:
+            pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+def _close_read_pool():
+    pool = _read_pool_state["pool"]
+    if pool is not None:
+        _drain_read_pool(pool)
+
+
+atexit.register(_close_read_pool)
+
+
+def _init_read_pool(identity):
+    """
+    Prepares the database (WAL, lookup index) with a short-lived read/write
+    connection and fills the read pool. Runs on first use and again whenever the
+    database file 'identity' no longer matches the one the pool was opened on.
+    Returns the pool to borrow from.
+    """
+    with _read_pool_lock:
+        pool = _read_pool_state["pool"]
+        if pool is not None and _read_pool_state["identity"] == identity:
+            return pool
+        conn = sqlite3.connect(cfg.SQLITE_DB_PATH, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=5000")
+            # WAL lets the pooled readers run alongside the writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            try:
+                # Index for the forwarding_port/forwarding_host lookups
+                conn.execute(sdb.STREAM_FORWARDING_INDEX_SQL)
+            except sqlite3.Error:
+                pass  # e.g. database locked or 'stream' table missing; queries still work
+        finally:
+            conn.close()
+        new_pool = queue.Queue()
+        for _ in range(READ_POOL_SIZE):
+            new_pool.put(_open_read_conn())
+        if pool is not None:
+            # The old connections still read the replaced (unlinked) database file
+            _drain_read_pool(pool)
+        _read_pool_state["pool"] = new_pool
+        _read_pool_state["identity"] = sdb.db_file_identity()
+        return new_pool
+
+
+@contextmanager
+def borrow_read():
+    """
+    Borrows a read-only connection from the pool and returns it when done.
+    """
+    pool = _read_pool_state["pool"]
+    identity = sdb.db_file_identity()
+    if pool is None or _read_pool_state["identity"] != identity:
+        pool = _init_read_pool(identity)
+    conn = pool.get()
+    try:
+        yield conn
+    finally:
+        pool.put(conn)
+
 
 def show_conflict_summary():
     """
@@ -41,40 +179,37 @@ def show_conflict_summary():
     """
     console.rule("[bold blue]Conflict Resolution Summary")
     cf_res.view_port_conflict_resolutions()
+    input("\nPress Enter to continue...")
 
 
 def get_conflict_resolution_info():
     """
     Retrieves information about all conflict resolution streams from the database.
-    Returns a list of tuples with details for each conflict.
+    Returns a list of (incoming_port, forwarding_host, forwarding_port, protocols) tuples,
+    where protocols is a tuple of "TCP"/"UDP".
     """
     if not os.path.exists(cfg.SQLITE_DB_PATH):
         return []
 
     conflict_streams = []
-    conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT incoming_port, forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding FROM stream WHERE is_deleted=0 AND incoming_port != forwarding_port"
-        )
-
-        for row in cur.fetchall():
-            incoming_port, forwarding_host, forwarding_port, tcp_f, udp_f = row
-            protocols = []
-            if tcp_f:
-                protocols.append("TCP")
-            if udp_f:
-                protocols.append("UDP")
-
-            conflict_streams.append(
-                (incoming_port, forwarding_host, forwarding_port, protocols)
+        with borrow_read() as conn:
+            cur = conn.cursor()
+            cur.execute(_SQL_CONFLICT_INFO)
+            rows = cur.fetchall()
+
+        conflict_streams = [
+            (
+                incoming_port,
+                forwarding_host,
+                forwarding_port,
+                _PROTO_TABLE[(bool(tcp_f) << 1) | bool(udp_f)],
             )
+            for incoming_port, forwarding_host, forwarding_port, tcp_f, udp_f in rows
+        ]
 
     except Exception as e:
         ws_error("[STREAM_MANAGER]", f"Error getting conflict resolution info: {e}")
-    finally:
-        conn.close()
 
     return conflict_streams
 
@@ -88,44 +223,30 @@ def find_conflict_resolution_by_multiple_ips(original_port, protocol, client_ips
     if not os.path.exists(cfg.SQLITE_DB_PATH):
         return None
 
-    conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
-    try:
-        cur = conn.cursor()
+    client_ips = list(dict.fromkeys(client_ips))
+    # Column of the protocol flag in the rows selected below
+    flag_index = {"tcp": 2, "udp": 3}.get(protocol.lower())
+    if not client_ips or flag_index is None:
+        return None
 
-        # Check for existing conflict resolutions for any of the client IPs
-        for client_ip in client_ips:
+    try:
+        # One query for all client IPs, including the protocol flags (no per-row lookups)
+        with borrow_read() as conn:
+            cur = conn.cursor()
             cur.execute(
-                "SELECT incoming_port, forwarding_host FROM stream WHERE forwarding_port=? AND is_deleted=0 AND incoming_port!=forwarding_port",
-                (original_port,),
+                _sql_find_by_ips(len(client_ips)), (original_port, *client_ips)
             )
+            rows = cur.fetchall()
 
-            for row in cur.fetchall():
-                incoming_port, forwarding_host = row
-
-                # Check if this matches our protocol and any of our client IPs
-                if forwarding_host in client_ips:
-                    cur.execute(
-                        "SELECT tcp_forwarding, udp_forwarding FROM stream WHERE incoming_port=? AND forwarding_host=? AND is_deleted=0",
-                        (incoming_port, forwarding_host),
-                    )
-                    stream_row = cur.fetchone()
-
-                    if stream_row:
-                        tcp_f, udp_f = stream_row
-                        has_protocol = (protocol.lower() == "tcp" and tcp_f) or (
-                            protocol.lower() == "udp" and udp_f
-                        )
-
-                        if has_protocol:
-                            return (incoming_port, forwarding_host)
+        for row in rows:
+            if row[flag_index]:
+                return (row[0], row[1])
 
         return None
 
     except Exception as e:
         ws_error("[STREAM_MANAGER]", f"Error finding conflict resolution: {e}")
         return None
-    finally:
-        conn.close()
 
 
 # Copied
@@ -157,15 +278,56 @@ def get_next_available_port(
     raise RuntimeError("No available ports in the specified range.")
 
 
+def schedule_conflict_notification():
+    """
+    Schedules notify_clients_of_conflicts_and_assignments() without stacking broadcasts.
+    If a notification is already pending, this call is absorbed by it; otherwise it runs
+    as soon as NOTIFY_MIN_INTERVAL seconds have passed since the previous one.
+    Must be called from the event loop thread.
+    """
+    task = _notify_state["task"]
+    if task is not None and not task.done():
+        return task
+    delay = max(0.0, _notify_state["last_ts"] + NOTIFY_MIN_INTERVAL - time.monotonic())
+    task = asyncio.get_running_loop().create_task(_run_scheduled_notification(delay))
+    _notify_state["task"] = task
+    return task
+
+
+async def _run_scheduled_notification(delay):
+    """
+    Waits for the debounce delay and then sends one coalesced notification.
+    """
+    if delay:
+        await asyncio.sleep(delay)
+    try:
+        await notify_clients_of_conflicts_and_assignments()
+    except Exception as e:
+        ws_error("[WS]", f"Error notifying clients of port assignments: {e}")
+    finally:
+        _notify_state["last_ts"] = time.monotonic()
+        _notify_state["task"] = None
+
+
 # Copied
 async def notify_clients_of_conflicts_and_assignments():
     """
     Notify all connected clients about port conflicts and which ports are assigned to which client.
     Assign ports deterministically (first come, first served).
     """
-    connected_clients_copy = dict(cfg.connected_clients)
+    # Una sola instantánea de los clientes para ambas pasadas
+    clients_snapshot = list(cfg.connected_clients.items())
+    # Same clients, websockets and ports (in the same order) as the last run:
+    # the assignments and the messages would be identical, so skip the broadcast.
+    # Websockets are keyed by id() so no reference outlives the connection.
+    fingerprint = tuple(
+        (client_id, id(info.get("ws")), frozenset(info.get("ports", ())))
+        for client_id, info in clients_snapshot
+    )
+    if fingerprint == _notify_state["fingerprint"]:
+        return
     port_map = {}
-    for client_id, info in connected_clients_copy.items():
+    for client_id, info in clients_snapshot:
         for port_proto in info.get("ports", set()):
             port_map.setdefault(port_proto, []).append(client_id)
 
@@ -179,39 +341,40 @@ async def notify_clients_of_conflicts_and_assignments():
     prev_assigned_ports = dict(cfg.assigned_ports)
     cfg.assigned_ports = new_assigned_ports
 
-    connected_clients_copy = dict(cfg.connected_clients)
-    for client_id, info in connected_clients_copy.items():
+    # Puertos entrantes ocupados; crece a medida que se asignan alternativos.
+    # Como solo crece, el primer hueco libre nunca retrocede y basta un cursor.
+    used_incoming_ports = {p for (p, _) in cfg.assigned_ports}
+    min_port, max_port = 20000, 60000
+    next_candidate = min_port
+
+    sends = []
+    for index, (client_id, info) in enumerate(clients_snapshot, 1):
+        # Yield to the event loop between batches of clients
+        if index % BROADCAST_BATCH_SIZE == 0:
+            await asyncio.sleep(0)
         assigned = []
         conflicts = []
         for port_proto in info.get("ports", set()):
             owner = cfg.assigned_ports.get(port_proto)
             if owner == client_id:
                 assigned.append(
-                    {
-                        "port": port_proto[0],
-                        "protocol": port_proto[1],
-                        "assigned": True,
-                        "incoming_port": port_proto[0],
-                    }
+                    _encode_assignment_entry(
+                        port_proto[0], port_proto[1], True, port_proto[0]
+                    )
                 )
             else:
-                alt_port = None
-                used_incoming_ports = set(
-                    p for (p, _), cid in cfg.assigned_ports.items()
-                )
-                min_port, max_port = 20000, 60000
-                for candidate in range(min_port, max_port):
-                    if candidate not in used_incoming_ports:
-                        alt_port = candidate
-                        break
+                while (
+                    next_candidate < max_port
+                    and next_candidate in used_incoming_ports
+                ):
+                    next_candidate += 1
+                alt_port = next_candidate if next_candidate < max_port else None
                 if alt_port is not None:
+                    used_incoming_ports.add(alt_port)
                     assigned.append(
-                        {
-                            "port": port_proto[0],
-                            "protocol": port_proto[1],
-                            "assigned": False,
-                            "incoming_port": alt_port,
-                        }
+                        _encode_assignment_entry(
+                            port_proto[0], port_proto[1], False, alt_port
+                        )
                     )
                     cfg.assigned_ports[(alt_port, port_proto[1])] = client_id
                 conflicts.append(
@@ -222,80 +385,129 @@ async def notify_clients_of_conflicts_and_assignments():
                         "assigned_to": owner,
                     }
                 )
-        try:
-            ws = info["ws"]
-            if hasattr(ws, "closed") and ws.closed:
-                continue
-            await ws.send(
+        ws = info["ws"]
+        if getattr(ws, "closed", False):
+            continue
+        payload = _ASSIGNMENTS_TMPL.format(", ".join(assigned), json.dumps(conflicts))
+        sends.append(_safe_send(ws, client_id, [payload]))
+    all_sent = all(await asyncio.gather(*sends))
+
+    # Notificación de cambios de asignación y conflictos
+    # Mensajes agrupados por cliente para conservar su orden en cada websocket
+    # Solo los puertos cuyo propietario ha cambiado desde la última asignación
+    changed_ports = {
+        port_proto: clients
+        for port_proto, clients in port_map.items()
+        if prev_assigned_ports.get(port_proto) != clients[0]
+    }
+    updates = {}
+    for index, (port_proto, clients) in enumerate(changed_ports.items(), 1):
+        if index % BROADCAST_BATCH_SIZE == 0:
+            await asyncio.sleep(0)
+        client_id = clients[0]
+        info = cfg.connected_clients.get(client_id)
+        if not info or getattr(info["ws"], "closed", False):
+            continue
+        payloads = updates.setdefault(client_id, (info["ws"], []))[1]
+        if len(clients) == 1:
+            payloads.append(
+                _encode_assignment(port_proto[0], port_proto[1], True, port_proto[0])
+            )
+            logging.info(
+                f"Port {port_proto[0]} ({port_proto[1]}) assigned to {client_id} after conflict resolution"
+            )
+        else:
+            payloads.append(
+                _encode_assignment(port_proto[0], port_proto[1], False, port_proto[0])
+            )
+            payloads.append(
                 json.dumps(
                     {
-                        "type": "client_port_assignments",
-                        "assignments": assigned,
-                        "conflicts": conflicts,
+                        "type": "client_port_conflict_resolution",
+                        "port": port_proto[0],
+                        "protocol": port_proto[1],
+                        "conflicting_clients": clients,
+                        "assigned_to": client_id,
                     }
                 )
             )
-        except Exception as ex:
-            logging.debug(f"Client {client_id} websocket closed or error: {ex}")
+    results = await asyncio.gather(
+        *(
+            _safe_send(ws, client_id, payloads, report_errors=True)
+            for client_id, (ws, payloads) in updates.items()
+        )
+    )
+    # A failed send must not be skipped next time as "already notified"
+    if all_sent and all(results):
+        _notify_state["fingerprint"] = fingerprint
 
-    # Notificación de cambios de asignación y conflictos
-    for port_proto, clients in port_map.items():
-        changed = prev_assigned_ports.get(port_proto) != clients[0]
-        client_id = clients[0]
-        info = cfg.connected_clients.get(client_id)
-        if not info or (hasattr(info["ws"], "closed") and info["ws"].closed):
-            continue
-        ws = info["ws"]
+
+# 'client_port_assignments' message, filled with already serialized entries.
+# Same output as json.dumps() of the equivalent dict.
+_ASSIGNMENTS_TMPL = (
+    '{{"type": "client_port_assignments", "assignments": [{}], "conflicts": {}}}'
+)
+
+
+@functools.lru_cache(maxsize=2048)
+def _encode_assignment_entry(port, protocol, assigned, incoming_port):
+    """
+    Returns one serialized entry of a 'client_port_assignments' message.
+    Port and protocol come from the client, so they are still escaped by json.dumps.
+    """
+    return json.dumps(
+        {
+            "port": port,
+            "protocol": protocol,
+            "assigned": assigned,
+            "incoming_port": incoming_port,
+        }
+    )
+
+
+@functools.lru_cache(maxsize=512)
+def _encode_assignment(port, protocol, assigned, incoming_port):
+    """
+    Returns the serialized 'client_port_assignment_update' message.
+    The payload only depends on its arguments, so repeated updates reuse the same string.
+    """
+    return json.dumps(
+        {
+            "type": "client_port_assignment_update",
+            "port": port,
+            "protocol": protocol,
+            "assigned": assigned,
+            "incoming_port": incoming_port,
+        }
+    )
+
+
+async def _safe_send(ws, client_id, payloads, report_errors=False):
+    """
+    Sends the already serialized payloads to one client, in order.
+    Errors are logged and never raised, so one broken websocket does not
+    cancel the other sends of a gather(). Returns True if every payload was sent.
+    """
+    try:
+        for payload in payloads:
+            await ws.send(payload)
+        return True
+    except Exception as ex:
+        if not report_errors:
+            logging.debug(f"Client {client_id} websocket closed or error: {ex}")
+            return False
         try:
-            if len(clients) == 1 and changed:
-                await ws.send(
-                    json.dumps(
-                        {
-                            "type": "client_port_assignment_update",
-                            "port": port_proto[0],
-                            "protocol": port_proto[1],
-                            "assigned": True,
-                            "incoming_port": port_proto[0],
-                        }
-                    )
-                )
-                logging.info(
-                    f"Port {port_proto[0]} ({port_proto[1]}) assigned to {client_id} after conflict resolution"
-                )
-            elif len(clients) > 1 and changed:
-                await ws.send(
-                    json.dumps(
-                        {
-                            "type": "client_port_assignment_update",
-                            "port": port_proto[0],
-                            "protocol": port_proto[1],
-                            "assigned": False,
-                            "incoming_port": port_proto[0],
-                        }
-                    )
-                )
-                await ws.send(
-                    json.dumps(
-                        {
-                            "type": "client_port_conflict_resolution",
-                            "port": port_proto[0],
-                            "protocol": port_proto[1],
-                            "conflicting_clients": clients,
-                            "assigned_to": client_id,
-                        }
-                    )
-                )
-        except Exception as ex:
-            try:
-                if hasattr(ws, "closed") and not ws.closed:
-                    ws_error(
-                        "[WS]",
-                        f"Error notifying client {client_id} of port assignment/conflict update: {ex}",
-                    )
-            except Exception:
-                logging.debug(
-                    f"Error checking websocket status for client {client_id}: {ex}"
+            # Only report while the socket is known to be open
+            if not getattr(ws, "closed", True):
+                ws_error(
+                    "[WS]",
+                    f"Error notifying client {client_id} of port assignment/conflict update: {ex}",
                 )
+        except Exception:
+            logging.debug(
+                f"Error checking websocket status for client {client_id}: {ex}"
+            )
+        return False
 
 
 # Copied
@@ -303,7 +515,6 @@ def get_saved_alternative_port(original_port, protocol, server_ip):
     """
     Retrieve a previously saved alternative port for a given original port, protocol, and server IP.
     """
-    key = f"{original_port}|{protocol}|{server_ip}"
     return cfg.port_conflict_resolutions.get((original_port, protocol, server_ip))
 
 
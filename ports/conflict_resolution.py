@@ -1,8 +1,13 @@
+import asyncio
+import atexit
+import functools
 import json
 import logging
 import os
 import sys
+import threading
 import time
+from urllib.request import pathname2url
 
 # Ensure parent directory is in sys.path for local imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,8 +19,8 @@ from Config import config as cfg
 from Streams import stream_com_handler as sch
 from Streams import stream_creation as sc
 from Streams import stream_creation_db as scdb
-from npm import npm_handler as npm
-from UI.console_handler import ws_info, ws_error, ws_warning
+from Streams import stream_db_handler as sdb
+from UI.console_handler import ws_info, ws_error
 
 console = Console()
 
@@ -70,10 +75,32 @@ def print_conflict_resolution_summary():
         )
 
 
+# Parsed JSON files by path: (st_mtime_ns, st_size, data)
+_json_file_cache = {}
+
+
+def _load_json_file(path):
+    """
+    Reads and parses a JSON file in one binary read (json detects the UTF encoding
+    itself, so no text-mode decoding layer is needed).
+    The result is reused while the file's mtime and size are unchanged, so it must
+    not be modified by the caller.
+    """
+    st = os.stat(path)
+    cached = _json_file_cache.get(path)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    _json_file_cache[path] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+
 def view_port_conflict_resolutions():
     """
     Shows all current port conflict resolutions, both from the database and from files.
     Also includes client assignments.
+    Does not wait for the user; interactive callers prompt afterwards.
     """
     ws_info(
         "[CONFLICT]", "\n[bold cyan]📊 PORT CONFLICT RESOLUTIONS STATUS[/bold cyan]"
@@ -90,13 +117,9 @@ def view_port_conflict_resolutions():
 
     # Show saved conflict resolutions from ws_server
     try:
-        import json
-        import os
-
         resolutions_file = "port_conflict_resolutions.json"
         if os.path.exists(resolutions_file):
-            with open(resolutions_file, "r") as f:
-                saved_resolutions = json.load(f)
+            saved_resolutions = _load_json_file(resolutions_file)
 
             if saved_resolutions:
                 ws_info(
@@ -128,8 +151,7 @@ def view_port_conflict_resolutions():
     try:
         assignments_file = "client_assignments.json"
         if os.path.exists(assignments_file):
-            with open(assignments_file, "r") as f:
-                client_assignments = json.load(f)
+            client_assignments = _load_json_file(assignments_file)
 
             if client_assignments:
                 ws_info(
@@ -165,15 +187,183 @@ def view_port_conflict_resolutions():
     except Exception as e:
         ws_error("[CONFLICT]", f"Error reading client assignments: {e}")
 
-    ws_info("[CONFLICT]", "\n[bold green]Press Enter to continue...[/bold green]")
-    input()
+
+# Read-only connection shared by the conflict checks, opened on first use.
+# sqlite3 caches compiled statements per connection (by SQL text), so reusing it
+# avoids re-preparing the same queries on every request. Guarded by _conn_lock.
+_conn = None
+_conn_identity = None  # (st_dev, st_ino) of the database file _conn was opened on
+_conn_lock = threading.Lock()
+
+
+def _open_conn():
+    """
+    Opens a read-only connection to the stream database with the performance PRAGMAs
+    applied. The conflict checks only read; streams are written by Streams.stream_creation.
+    """
+    # WAL (readers do not block on the occasional stream writes) is a property of the
+    # database file and needs a writable connection to switch on.
+    rw_conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
+    try:
+        rw_conn.execute("PRAGMA busy_timeout=5000")
+        rw_conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            # Covering index for the incoming_port lookups below
+            rw_conn.execute(sdb.STREAM_INCOMING_INDEX_SQL)
+        except sqlite3.Error:
+            pass  # e.g. database locked or 'stream' table missing; queries still work
+    finally:
+        rw_conn.close()
+
+    conn = sqlite3.connect(
+        f"file:{pathname2url(os.path.abspath(cfg.SQLITE_DB_PATH))}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=256,
+    )
+    # Wait for writers instead of failing with 'database is locked'
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Memory-mapped reads (up to 256 MB) avoid a read() syscall per page
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def _close_conn():
+    if _conn is not None:
+        _conn.close()
+
+
+atexit.register(_close_conn)
+
+
+def _get_conn():
+    """
+    Returns the shared connection, opening it on first use and reopening it if the
+    database file was replaced (deleted and recreated) since it was opened.
+    Must be called with _conn_lock held.
+    """
+    global _conn, _conn_identity
+    identity = sdb.db_file_identity()
+    if _conn is not None and identity != _conn_identity:
+        # The old connection still reads the replaced (unlinked) database file
+        _conn.close()
+        _conn = None
+    if _conn is None:
+        _conn = _open_conn()
+        _conn_identity = sdb.db_file_identity()
+    return _conn
+
+
+# Live streams listening on, or forwarding to, any of the given ports. One query
+# answers the conflict check, the existing-stream check and the resolution lookup.
+# is_deleted=0 is repeated in each branch so SQLite can match both partial covering
+# indexes (incoming_port and forwarding_port) with a MULTI-INDEX OR.
+_SQL_STREAMS_FOR_PORTS = (
+    "SELECT id, incoming_port, forwarding_host, forwarding_port, tcp_forwarding, "
+    "udp_forwarding FROM stream "
+    "WHERE (is_deleted=0 AND incoming_port IN ({placeholders})) "
+    "OR (is_deleted=0 AND forwarding_port IN ({placeholders}))"
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _sql_streams_for_ports(port_count):
+    """
+    Returns the ports lookup query for a number of ports, always as the same
+    string so the statement cache can reuse it.
+    """
+    return _SQL_STREAMS_FOR_PORTS.format(placeholders=",".join("?" * port_count))
+
+
+def _fetch_port_streams(requested_ports):
+    """
+    Returns the live streams whose incoming or forwarding port is one of the
+    requested ports, as (id, incoming_port, forwarding_host, forwarding_port,
+    tcp_forwarding, udp_forwarding) rows ordered by id.
+    """
+    if not requested_ports or not os.path.exists(cfg.SQLITE_DB_PATH):
+        return []
+    ports = list({port for port, _ in requested_ports})
+    # Each port is bound twice (incoming and forwarding)
+    chunk_size = sch.MAX_SQL_VARIABLES // 2
+    rows = []
+    with _conn_lock:
+        cur = _get_conn().cursor()
+        for start in range(0, len(ports), chunk_size):
+            chunk = ports[start : start + chunk_size]
+            cur.execute(_sql_streams_for_ports(len(chunk)), chunk * 2)
+            rows.extend(cur.fetchall())
+    rows.sort()
+    return rows
+
+
+def _uses_protocol(group, tcp_f, udp_f):
+    """
+    Returns True if a stream with these forwarding flags serves the protocol group.
+    """
+    if group == "tcp":
+        return tcp_f == 1
+    if group == "udp":
+        return udp_f == 1
+    return tcp_f == 1 or udp_f == 1
+
+
+def classify_ports(requested_ports, client_ip):
+    """
+    Classifies the requested (port, protocol) pairs of a client with a single query.
+    Returns (conflict_info, existing_streams, existing_resolutions):
+    - conflict_info: as returned by check_port_conflicts
+    - existing_streams: {(port, protocol): stream_id} of streams already forwarding
+      that port to this client
+    - existing_resolutions: {(port, protocol): (incoming_port, stream_id)} of
+      conflict resolution streams forwarding to that port of this client
+    """
+    try:
+        streams = _fetch_port_streams(requested_ports)
+    except Exception as e:
+        ws_error("[STREAM_MANAGER]", f"Error loading streams for requested ports: {e}")
+        streams = []
+
+    conflict_info = check_port_conflicts(requested_ports, client_ip, streams=streams)
+
+    by_incoming = {}
+    by_forwarding = {}
+    for row in streams:
+        by_incoming.setdefault(row[1], []).append(row)
+        # A conflict resolution stream has incoming_port != forwarding_port
+        if row[1] != row[3]:
+            by_forwarding.setdefault(row[3], []).append(row)
+
+    existing_streams = {}
+    existing_resolutions = {}
+    if client_ip is None:
+        # forwarding_host=NULL never matches in SQL
+        return conflict_info, existing_streams, existing_resolutions
+    for port, protocol in requested_ports:
+        group = sch.protocol_group(protocol)
+        key = sch.port_key(port)
+        for stream_id, _, host, _, tcp_f, udp_f in by_incoming.get(key, ()):
+            if host == client_ip and _uses_protocol(group, tcp_f, udp_f):
+                existing_streams[(port, protocol)] = stream_id
+                break
+        for stream_id, incoming_port, host, _, tcp_f, udp_f in by_forwarding.get(
+            key, ()
+        ):
+            if host == client_ip and _uses_protocol(group, tcp_f, udp_f):
+                existing_resolutions[(port, protocol)] = (incoming_port, stream_id)
+                break
+
+    return conflict_info, existing_streams, existing_resolutions
 
 
 # Copied from other module: checks for port conflicts in the database
-def check_port_conflicts(requested_ports, client_ip=None):
+def check_port_conflicts(requested_ports, client_ip=None, streams=None):
     """
     Checks for port conflicts in the database for the requested ports.
     Only considers a conflict if the port is used by a different IP.
+    'streams' can pass rows already loaded with _fetch_port_streams.
     Returns a dictionary with the status of each port.
     """
     ws_info(
@@ -189,33 +379,33 @@ def check_port_conflicts(requested_ports, client_ip=None):
         }
 
     conflict_info = {}
+    client_host = client_ip or ""
+    # Per-port details only go to the debug log; the console gets one summary line
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    protocol_counts = {"tcp": 0, "udp": 0, "any": 0}
 
-    conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
     try:
-        cur = conn.cursor()
+        if streams is None:
+            streams = _fetch_port_streams(requested_ports)
+        by_incoming = {}
+        for row in streams:
+            by_incoming.setdefault(row[1], []).append(row)
 
         for port, protocol in requested_ports:
-            ws_info("[STREAM_MANAGER]", f"Checking port {port} ({protocol})")
-
-            # Check if port is used by a DIFFERENT IP address
-            if protocol.lower() == "tcp":
-                cur.execute(
-                    "SELECT id, forwarding_host, forwarding_port, tcp_forwarding FROM stream WHERE incoming_port=? AND tcp_forwarding=1 AND is_deleted=0 AND forwarding_host!=?",
-                    (port, client_ip or ""),
-                )
-            elif protocol.lower() == "udp":
-                cur.execute(
-                    "SELECT id, forwarding_host, forwarding_port, udp_forwarding FROM stream WHERE incoming_port=? AND udp_forwarding=1 AND is_deleted=0 AND forwarding_host!=?",
-                    (port, client_ip or ""),
-                )
-            else:
-                # Both TCP and UDP
-                cur.execute(
-                    "SELECT id, forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding FROM stream WHERE incoming_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND forwarding_host!=?",
-                    (port, client_ip or ""),
-                )
-
-            existing_stream = cur.fetchone()
+            group = sch.protocol_group(protocol)
+            protocol_counts[group] += 1
+            existing_stream = None
+            same_client = False
+            for stream_id, _, host, forwarding_port, tcp_f, udp_f in by_incoming.get(
+                sch.port_key(port), ()
+            ):
+                if not _uses_protocol(group, tcp_f, udp_f):
+                    continue
+                if host == client_host:
+                    same_client = True
+                elif host is not None:
+                    existing_stream = (stream_id, host, forwarding_port)
+                    break
 
             if existing_stream:
                 # Real conflict found - port used by different IP
@@ -233,34 +423,12 @@ def check_port_conflicts(requested_ports, client_ip=None):
                 }
             else:
                 # Check if same client is already using this port (not a conflict)
-                if protocol.lower() == "tcp":
-                    cur.execute(
-                        "SELECT id, forwarding_host, forwarding_port FROM stream WHERE incoming_port=? AND tcp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
-                        (port, client_ip or ""),
-                    )
-                elif protocol.lower() == "udp":
-                    cur.execute(
-                        "SELECT id, forwarding_host, forwarding_port FROM stream WHERE incoming_port=? AND udp_forwarding=1 AND is_deleted=0 AND forwarding_host=?",
-                        (port, client_ip or ""),
-                    )
-                else:
-                    cur.execute(
-                        "SELECT id, forwarding_host, forwarding_port FROM stream WHERE incoming_port=? AND (tcp_forwarding=1 OR udp_forwarding=1) AND is_deleted=0 AND forwarding_host=?",
-                        (port, client_ip or ""),
-                    )
-
-                same_client_stream = cur.fetchone()
-
-                if same_client_stream:
-                    ws_info(
-                        "[STREAM_MANAGER]",
-                        f"No conflict: Port {port} ({protocol}) already used by same client {client_ip}",
-                    )
-                else:
-                    ws_info(
-                        "[STREAM_MANAGER]",
-                        f"No conflict: Port {port} ({protocol}) is available",
+                if debug and same_client:
+                    logging.debug(
+                        f"No conflict: Port {port} ({protocol}) already used by same client {client_ip}"
                     )
+                elif debug:
+                    logging.debug(f"No conflict: Port {port} ({protocol}) is available")
 
                 conflict_info[port] = {"has_conflict": False, "existing_stream": None}
 
@@ -271,13 +439,12 @@ def check_port_conflicts(requested_ports, client_ip=None):
             port: {"has_conflict": False, "existing_stream": None}
             for port, _ in requested_ports
         }
-    finally:
-        conn.close()
 
     conflicts_found = sum(1 for info in conflict_info.values() if info["has_conflict"])
     ws_info(
         "[STREAM_MANAGER]",
-        f"Conflict check complete: {conflicts_found} real conflicts found out of {len(requested_ports)} ports",
+        f"Conflict check complete: {conflicts_found} real conflicts found out of {len(requested_ports)} ports "
+        f"({protocol_counts['tcp']} tcp, {protocol_counts['udp']} udp, {protocol_counts['any']} tcp+udp)",
     )
 
     return conflict_info
@@ -299,31 +466,42 @@ async def broadcast_port_conflict_resolutions(conflicts):
         "timestamp": int(time.time()),
     }
 
+    # Serialized once for every client
+    payload = json.dumps(conflict_message)
+
     disconnected_clients = []
-    broadcasted_to = 0
+    targets = []
+    for client_id, client_info in tuple(cfg.connected_clients.items()):
+        ws = client_info.get("ws")
+        if ws is None or (hasattr(ws, "closed") and ws.closed):
+            disconnected_clients.append((client_id, client_info))
+            continue
+        targets.append((client_id, client_info))
 
-    for client_id, client_info in cfg.connected_clients.items():
-        try:
-            ws = client_info["ws"]
-            if hasattr(ws, "closed") and ws.closed:
-                disconnected_clients.append(client_id)
-                continue
-
-            # Send the conflict resolution to this client
-            await ws.send(json.dumps(conflict_message))
-            broadcasted_to += 1
-            ws_info(
-                "[WS]",
-                f"Sent conflict resolutions to {client_info.get('hostname', 'unknown')} ({client_info.get('ip', 'unknown')})",
-            )
+    # Send to all clients concurrently; a slow client no longer delays the others
+    results = await asyncio.gather(
+        *(client_info["ws"].send(payload) for _, client_info in targets),
+        return_exceptions=True,
+    )
 
-        except Exception as ex:
-            logging.debug(f"Failed to send conflict resolution to {client_id}: {ex}")
-            disconnected_clients.append(client_id)
+    broadcasted_to = 0
+    for (client_id, client_info), result in zip(targets, results):
+        if isinstance(result, Exception):
+            logging.debug(
+                f"Failed to send conflict resolution to {client_id}: {result}"
+            )
+            disconnected_clients.append((client_id, client_info))
+            continue
+        broadcasted_to += 1
+        ws_info(
+            "[WS]",
+            f"Sent conflict resolutions to {client_info.get('hostname', 'unknown')} ({client_info.get('ip', 'unknown')})",
+        )
 
-    # Clean up disconnected clients
-    for dc_id in disconnected_clients:
-        if dc_id in cfg.connected_clients:
+    # Clean up disconnected clients; an entry replaced while the sends were in
+    # flight (the client reconnected) belongs to a new connection and is kept
+    for dc_id, dc_info in disconnected_clients:
+        if cfg.connected_clients.get(dc_id) is dc_info:
             del cfg.connected_clients[dc_id]
 
     ws_info(
@@ -353,31 +531,44 @@ async def process_ports_with_conflict_resolution(ip, hostname, ports, websocket)
         f"Processing {len(ports)} ports from {hostname} ({ip}) - conflict resolution mode",
     )
 
+    # Duplicate (port, protocol) entries are processed once; their results are
+    # repeated in the response so the client still gets one result per entry
+    requested_counts = {}
+    unique_ports = []
+    for entry in ports:
+        if not entry.get("port"):
+            continue
+        key = (entry.get("port"), entry.get("protocol", "tcp"))
+        if key not in requested_counts:
+            requested_counts[key] = 0
+            unique_ports.append(entry)
+        requested_counts[key] += 1
+
     # Convert ports to check format and pass client IP
-    ports_to_check = [
-        (entry.get("port"), entry.get("protocol", "tcp"))
-        for entry in ports
-        if entry.get("port")
-    ]
+    ports_to_check = list(requested_counts)
 
-    # Check for conflicts, excluding same client conflicts
-    conflict_info = check_port_conflicts(ports_to_check, client_ip=ip)
+    # Conflicts (excluding same client conflicts), existing streams and existing
+    # conflict resolutions of this client, all from one query
+    conflict_info, existing_streams, existing_resolutions = classify_ports(
+        ports_to_check, ip
+    )
 
-    # Separate ports with and without conflicts
-    no_conflict_ports = []
-    conflict_ports = []
-    existing_client_ports = []  # Ports that already exist for this client
-    existing_conflict_resolutions = []  # Ports that already have conflict resolutions
+    # Classify each port and build its result in a single pass; results keep
+    # the request order. Conflict results get their incoming port once the
+    # alternative ports are allocated below.
+    result_ports = []
+    new_entries = []  # incoming=forwarding for no conflicts
+    pending_conflicts = []  # (result, port, protocol) needing an alternative port
+    existing_count = 0  # Ports that already exist for this client
+    existing_resolution_count = 0  # Ports that already have conflict resolutions
 
-    for entry in ports:
+    for entry in unique_ports:
         port = entry.get("port")
         protocol = entry.get("protocol", "tcp")
-
-        if not port:
-            continue
+        key = (port, protocol)
 
         # First, check if this exact stream already exists for this client (same incoming and forwarding port)
-        existing_stream_id = sch.check_if_stream_exists_for_client(port, protocol, ip)
+        existing_stream_id = existing_streams.get(key)
 
         if existing_stream_id:
             # Stream already exists for this client - just acknowledge it
@@ -385,110 +576,80 @@ async def process_ports_with_conflict_resolution(ip, hostname, ports, websocket)
                 "[WS]",
                 f"Stream already exists for client {ip}: Port {port} ({protocol}) - Stream ID {existing_stream_id}",
             )
-            existing_client_ports.append(entry)
-        else:
-            # Check if there's an existing conflict resolution for this port
-            existing_resolution = sch.check_existing_conflict_resolution(
-                ip, port, protocol
+            existing_count += 1
+            result_ports.append(
+                {
+                    "puerto": port,
+                    "protocolo": protocol,
+                    "incoming_port": port,  # Same port for existing streams
+                    "conflict_resolved": False,
+                    "status": "existing",
+                }
             )
+            continue
 
-            if existing_resolution:
-                incoming_port, stream_id = existing_resolution
-                ws_info(
-                    "[WS]",
-                    f"Existing conflict resolution found for {ip}: Port {port} ({protocol}) → incoming port {incoming_port} (Stream ID {stream_id})",
-                )
-                existing_conflict_resolutions.append(
-                    {
-                        "entry": entry,
-                        "incoming_port": incoming_port,
-                        "stream_id": stream_id,
-                    }
-                )
-            elif not conflict_info.get(port, {}).get("has_conflict", False):
-                # No conflict with other clients
-                no_conflict_ports.append(entry)
-            else:
-                # Real conflict with different client - needs new resolution
-                conflict_ports.append(entry)
-
-    ws_info("[WS]", f"Existing client streams: {len(existing_client_ports)}")
-    ws_info(
-        "[WS]", f"Existing conflict resolutions: {len(existing_conflict_resolutions)}"
-    )
-    ws_info("[WS]", f"Ports without conflicts: {len(no_conflict_ports)}")
-    ws_info("[WS]", f"Ports needing new conflict resolution: {len(conflict_ports)}")
-
-    # Process results
-    result_ports = []
-    conflict_resolutions = []
-
-    # Handle existing client ports (no action needed, just acknowledge)
-    for entry in existing_client_ports:
-        result_ports.append(
-            {
-                "puerto": entry.get("port"),
-                "protocolo": entry.get("protocol", "tcp"),
-                "incoming_port": entry.get("port"),  # Same port for existing streams
-                "conflict_resolved": False,
-                "status": "existing",
-            }
-        )
-
-    # Handle existing conflict resolutions (no action needed, just acknowledge)
-    for resolution in existing_conflict_resolutions:
-        entry = resolution["entry"]
-        incoming_port = resolution["incoming_port"]
-        result_ports.append(
-            {
-                "puerto": entry.get("port"),
-                "protocolo": entry.get("protocol", "tcp"),
-                "incoming_port": incoming_port,
-                "conflict_resolved": True,
-                "status": "existing_conflict_resolution",
-            }
-        )
-
-    # Process ports without conflicts normally
-    if no_conflict_ports:
-        # Create streams for non-conflicting ports
-        new_entries = []
-        for entry in no_conflict_ports:
-            port = entry.get("port")
-            protocol = entry.get("protocol", "tcp")
-            new_entries.append(
-                (port, protocol, ip, port)
-            )  # incoming=forwarding for no conflicts
-
-        if new_entries:
-            sc.add_streams_sqlite_with_ip_extended(new_entries)
-            ws_info("[WS]", f"Created {len(new_entries)} new streams without conflicts")
+        # Check if there's an existing conflict resolution for this port
+        existing_resolution = existing_resolutions.get(key)
 
-        # Add to results
-        for entry in no_conflict_ports:
+        if existing_resolution:
+            incoming_port, stream_id = existing_resolution
+            ws_info(
+                "[WS]",
+                f"Existing conflict resolution found for {ip}: Port {port} ({protocol}) → incoming port {incoming_port} (Stream ID {stream_id})",
+            )
+            existing_resolution_count += 1
             result_ports.append(
                 {
-                    "puerto": entry.get("port"),
-                    "protocolo": entry.get("protocol", "tcp"),
-                    "incoming_port": entry.get("port"),
+                    "puerto": port,
+                    "protocolo": protocol,
+                    "incoming_port": incoming_port,
+                    "conflict_resolved": True,
+                    "status": "existing_conflict_resolution",
+                }
+            )
+        elif not conflict_info.get(port, {}).get("has_conflict", False):
+            # No conflict with other clients
+            new_entries.append((port, protocol, ip, port))
+            result_ports.append(
+                {
+                    "puerto": port,
+                    "protocolo": protocol,
+                    "incoming_port": port,
                     "conflict_resolved": False,
                     "status": "created",
                 }
             )
+        else:
+            # Real conflict with different client - needs new resolution
+            result = {
+                "puerto": port,
+                "protocolo": protocol,
+                "incoming_port": None,
+                "conflict_resolved": True,
+                "status": "new_conflict_resolution",
+            }
+            result_ports.append(result)
+            pending_conflicts.append((result, port, protocol))
+
+    ws_info("[WS]", f"Existing client streams: {existing_count}")
+    ws_info("[WS]", f"Existing conflict resolutions: {existing_resolution_count}")
+    ws_info("[WS]", f"Ports without conflicts: {len(new_entries)}")
+    ws_info("[WS]", f"Ports needing new conflict resolution: {len(pending_conflicts)}")
 
     # Handle new conflict resolution (only for ports that don't have existing resolutions)
-    if conflict_ports:
-        # Get alternative ports for real conflicts
-        conflict_port_numbers = [entry.get("port") for entry in conflict_ports]
+    conflict_entries = []
+    conflict_resolutions = []
+    if pending_conflicts:
+        # Get alternative ports for real conflicts; the new streams above are not
+        # written yet, so their ports are reserved explicitly
         alternative_ports = sch.get_next_available_ports(
-            conflict_port_numbers, len(conflict_ports)
+            [port for _, port, _ in pending_conflicts],
+            len(pending_conflicts),
+            reserved_ports=[entry[0] for entry in new_entries],
         )
 
         # Create streams with alternative ports
-        conflict_entries = []
-        for i, entry in enumerate(conflict_ports):
-            original_port = entry.get("port")
-            protocol = entry.get("protocol", "tcp")
+        for i, (result, original_port, protocol) in enumerate(pending_conflicts):
             alternative_port = (
                 alternative_ports[i]
                 if i < len(alternative_ports)
@@ -497,16 +658,7 @@ async def process_ports_with_conflict_resolution(ip, hostname, ports, websocket)
 
             # Create stream: alternative_port -> ip:original_port
             conflict_entries.append((alternative_port, protocol, ip, original_port))
-
-            result_ports.append(
-                {
-                    "puerto": original_port,
-                    "protocolo": protocol,
-                    "incoming_port": alternative_port,
-                    "conflict_resolved": True,
-                    "status": "new_conflict_resolution",
-                }
-            )
+            result["incoming_port"] = alternative_port
 
             conflict_resolutions.append(
                 {
@@ -518,42 +670,51 @@ async def process_ports_with_conflict_resolution(ip, hostname, ports, websocket)
                 }
             )
 
+    # New streams and conflict resolution streams in one transaction; the .conf
+    # files are synced once below instead of after each insert
+    if new_entries or conflict_entries:
+        sc.add_streams_sqlite_with_ip_extended(
+            new_entries + conflict_entries, sync=False
+        )
+        if new_entries:
+            ws_info("[WS]", f"Created {len(new_entries)} new streams without conflicts")
         if conflict_entries:
-            sc.add_streams_sqlite_with_ip_extended(conflict_entries)
             ws_info(
                 "[WS]",
                 f"Created {len(conflict_entries)} NEW conflict resolution streams",
             )
 
-    # Sync and reload NPM only if there were actual changes
-    if no_conflict_ports or conflict_ports:
-        scdb.sync_streams_conf_with_sqlite()
-        npm.reload_npm()
-        ws_info("[WS]", f"Configuration synced and NPM reloaded")
+    # Sync and reload NPM only if there were actual changes; registrations that
+    # arrive in a burst share one debounced sync and reload
+    if new_entries or conflict_entries:
+        scdb.request_npm_reload()
+        ws_info("[WS]", f"Configuration sync and NPM reload scheduled")
     else:
         ws_info(
             "[WS]",
             f"No new streams created - all ports already exist or have existing resolutions",
         )
 
+    if len(unique_ports) < sum(requested_counts.values()):
+        result_ports = [
+            result
+            for result in result_ports
+            for _ in range(requested_counts[(result["puerto"], result["protocolo"])])
+        ]
+
     # Send response to client
-    total_processed = (
-        len(existing_client_ports)
-        + len(existing_conflict_resolutions)
-        + len(no_conflict_ports)
-        + len(conflict_ports)
-    )
+    total_processed = len(unique_ports)
 
     response = {
         "status": "ok",
         "type": "client_port_conflict_resolution_response",
-        "msg": f"Processed {total_processed} ports. {len(existing_client_ports)} existing, {len(existing_conflict_resolutions)} existing resolutions, {len(no_conflict_ports)} new, {len(conflict_resolutions)} new conflicts resolved.",
+        "msg": f"Processed {total_processed} ports. {existing_count} existing, {existing_resolution_count} existing resolutions, {len(new_entries)} new, {len(conflict_resolutions)} new conflicts resolved.",
         "resultados": result_ports,
         "conflict_resolutions": conflict_resolutions,
         "summary": {
-            "existing_streams": len(existing_client_ports),
-            "existing_conflict_resolutions": len(existing_conflict_resolutions),
-            "new_streams": len(no_conflict_ports),
+            "existing_streams": existing_count,
+            "existing_conflict_resolutions": existing_resolution_count,
+            "new_streams": len(new_entries),
             "new_conflict_resolutions": len(conflict_resolutions),
             "total_processed": total_processed,
         },
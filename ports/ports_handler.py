@@ -1,4 +1,7 @@
+import asyncio
+import functools
 import json
+import re
 import sqlite3
 import time
 import websockets
@@ -14,19 +17,110 @@ from Server import ws_server
 from ports import conflict_resolution as cr
 from ports import conflict_handler as ch
 from Streams import stream_creation as sc
-from npm import npm_handler as npmh
+from Streams import stream_creation_db as scdb
 from Core import message_handler
 from Core import remote_message_handler
 from UI.console_handler import ws_info, ws_warning, ws_error
 
 console = Console()
 
+# SQLite limita el número de parámetros por sentencia (999 en builds antiguos)
+SQLITE_MAX_PARAMS = 900
+
+# PRAGMAs aplicados a cada conexión del handler: WAL evita el journal de rollback,
+# mmap permite leer páginas sin copias y las tablas temporales quedan en memoria
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "mmap_size=268435456",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+)
+
+# Respuestas fijas serializadas una sola vez (se envían como frames de texto, igual que antes)
+_MSG_INVALID_TOKEN = json.dumps({"status": "error", "msg": "Invalid token"})
+_MSG_TOKEN_OK = json.dumps(
+    {"status": "ok", "msg": "Valid token, waiting for port data"}
+)
+_MSG_PONG = json.dumps({"status": "ok", "msg": "pong"})
+
+# Oculta el valor de "token" en los logs sin decodificar/recodificar el JSON completo
+_TOKEN_RE = re.compile(r'"token"\s*:\s*"(?:[^"\\]|\\.)*"')
+
+# Segundos durante los que se reutiliza la IP local de WireGuard antes de volver a consultarla
+WG_IP_CACHE_TTL = 30
+# "version" se incrementa cada vez que cambia el estado de WireGuard
+_wg_cache = {"ip": None, "ts": 0.0, "version": 0}
+
+
+def _wg_ip():
+    """
+    Devuelve la IP local de wg0 cacheada durante WG_IP_CACHE_TTL segundos, evitando
+    un ioctl/subproceso por cada mensaje recibido.
+    """
+    now = time.monotonic()
+    if _wg_cache["ts"] == 0.0 or now - _wg_cache["ts"] > WG_IP_CACHE_TTL:
+        ip = wg_tools.get_local_wg_ip("wg0")
+        if ip != _wg_cache["ip"]:
+            _wg_cache["version"] += 1
+        _wg_cache["ip"] = ip
+        _wg_cache["ts"] = now
+    return _wg_cache["ip"]
+
+
+def invalidate_wg_ip_cache():
+    """
+    Fuerza a que la próxima llamada a _wg_ip vuelva a consultar la interfaz wg0
+    y a que se regenere la respuesta de capacidades.
+    """
+    _wg_cache["ts"] = 0.0
+    _wg_cache["version"] += 1
+
+
+# Respuesta de query_capabilities ya serializada, válida para una versión del estado WG
+# y durante CAPABILITIES_CACHE_TTL segundos (el peer WG puede cambiar sin que cambie wg0)
+CAPABILITIES_CACHE_TTL = 30
+_caps_cache = {"version": -1, "ts": 0.0, "payload": None, "server_type": None}
+
+
+def _get_capabilities_payload():
+    """
+    Devuelve (payload JSON, server_type) de la respuesta de capacidades.
+    Solo se reconstruye (incluido el escaneo de peers WG) cuando cambia el estado de
+    WireGuard o han pasado CAPABILITIES_CACHE_TTL segundos.
+    """
+    wg_ip = _wg_ip()
+    now = time.monotonic()
+    if (
+        _caps_cache["version"] != _wg_cache["version"]
+        or now - _caps_cache["ts"] > CAPABILITIES_CACHE_TTL
+    ):
+        wg_available = wg_ip is not None
+        wg_peer_ip = wg_utils.get_peer_ip_for_client() if wg_available else None
+        server_type = "wireguard" if wg_available else "conflict_resolution"
+        capabilities = {
+            "status": "ok",
+            "server_capabilities": {
+                "has_wireguard": wg_available,
+                "wireguard_ip": wg_ip,
+                "wireguard_peer_ip": wg_peer_ip,
+                "conflict_resolution_server": not wg_available,  # Non-WG servers handle conflict resolution
+                "port_forwarding_server": wg_available,  # WG servers handle port forwarding only
+                "server_type": server_type,
+            },
+        }
+        _caps_cache["payload"] = json.dumps(capabilities)
+        _caps_cache["server_type"] = server_type
+        _caps_cache["version"] = _wg_cache["version"]
+        _caps_cache["ts"] = now
+    return _caps_cache["payload"], _caps_cache["server_type"]
+
 
 async def process_pending_remote_ports_if_needed():
     """
     Procesa los puertos remotos pendientes si el servidor es de tipo conflict_resolution.
     """
-    wg_mode = wg_tools.get_local_wg_ip("wg0") is not None
+    wg_mode = _wg_ip() is not None
     if not wg_mode:
         from Core import remote_message_handler as rmh
 
@@ -50,7 +144,7 @@ async def process_pending_remote_ports_if_needed():
             from Streams import stream_creation
 
             stream_creation.add_streams_sqlite_with_ip_extended(
-                [(port, proto, forwarding_host, forwarding_port)]
+                [(port, proto, forwarding_host, forwarding_port)], sync=False
             )
             processed += 1
             ws_info(
@@ -58,38 +152,153 @@ async def process_pending_remote_ports_if_needed():
                 f"Stream remoto procesado: {port}/{proto} -> {forwarding_host}:{forwarding_port}",
             )
         if processed:
-            from Streams import stream_creation_db as scdb
-
-            scdb.sync_streams_conf_with_sqlite()
-            npmh.reload_npm()
+            scdb.request_npm_reload()
             ws_info(
                 "[REMOTE]", f"{processed} streams remotos procesados y sincronizados."
             )
 
 
+def _open_db():
+    """
+    Abre la conexión SQLite que reutiliza un cliente WebSocket durante toda su sesión.
+    """
+    # check_same_thread=False es seguro: la conexión solo se usa desde un hilo a la vez
+    # (las llamadas asyncio.to_thread de un cliente se esperan secuencialmente)
+    conn = sqlite3.connect(cfg.SQLITE_DB_PATH, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def _fetch_live_streams(cur, columns, ports):
+    """
+    Devuelve {incoming_port: fila} con las columnas indicadas para los streams activos
+    de los puertos dados. Usa consultas IN por lotes para respetar el límite de
+    parámetros de SQLite.
+    """
+    ports_list = list({int(p) for p in ports if p is not None})
+    existing = {}
+    for i in range(0, len(ports_list), SQLITE_MAX_PARAMS):
+        chunk = ports_list[i : i + SQLITE_MAX_PARAMS]
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(
+            f"SELECT incoming_port, {columns} FROM stream WHERE is_deleted=0 AND incoming_port IN ({placeholders})",
+            chunk,
+        )
+        for row in cur.fetchall():
+            existing.setdefault(row[0], row[1:])
+    return existing
+
+
+def _diff_streams(db, entries):
+    """
+    Compara las entradas (incoming_port:int, proto, ip:str, forwarding_port:int) con los streams
+    activos y devuelve solo las que son nuevas o requieren actualización.
+    Función síncrona pensada para ejecutarse con asyncio.to_thread.
+    """
+    cur = db.cursor()
+    try:
+        # Una sola consulta IN (por lotes) en lugar de un SELECT por puerto
+        existing = _fetch_live_streams(
+            cur,
+            "forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding",
+            [entry[0] for entry in entries],
+        )
+    finally:
+        cur.close()
+    to_add = []
+    for entry in entries:
+        # Las entradas ya llegan con tipos canónicos (int, str, str, int)
+        incoming_port, proto, ip_db, forwarding_port = entry
+        row = existing.get(incoming_port)
+        if row:
+            fwd_host, fwd_port, tcp_f, udp_f = row
+            # Verifica si la configuración es idéntica
+            if (
+                fwd_host == ip_db
+                and fwd_port == forwarding_port
+                and (tcp_f if proto == "tcp" else proto == "udp" and udp_f)
+            ):
+                continue
+        to_add.append(entry)
+    return to_add
+
+
+def _remove_streams(db, remove_ports):
+    """
+    Marca como eliminados los streams de los puertos/protocolos indicados por el cliente.
+    Devuelve la lista de "puerto/protocolo" eliminados.
+    Función síncrona pensada para ejecutarse con asyncio.to_thread.
+    """
+    # Pares (puerto, protocolo) únicos; un puerto no numérico no coincide con ningún stream
+    requested = {}
+    for entry in remove_ports:
+        try:
+            port = int(entry.get("puerto"))
+        except (TypeError, ValueError):
+            continue
+        requested[(port, entry.get("protocolo", "tcp"))] = None
+    cur = db.cursor()
+    try:
+        existing = _fetch_live_streams(
+            cur,
+            "id, tcp_forwarding, udp_forwarding",
+            [port for port, _ in requested],
+        )
+    finally:
+        cur.close()
+    removed = []
+    tcp_ids = []
+    udp_ids = []
+    for port, proto in requested:
+        row = existing.get(port)
+        if row:
+            stream_id, tcp_f, udp_f = row
+            if proto == "tcp" and tcp_f:
+                tcp_ids.append((stream_id,))
+                removed.append(f"{port}/tcp")
+            elif proto == "udp" and udp_f:
+                udp_ids.append((stream_id,))
+                removed.append(f"{port}/udp")
+    # Set is_deleted=1 and enabled=0 for the matching streams in a single transaction
+    with db:
+        if tcp_ids:
+            db.executemany(
+                "UPDATE stream SET tcp_forwarding=0, is_deleted=1, enabled=0 WHERE id=?",
+                tcp_ids,
+            )
+        if udp_ids:
+            db.executemany(
+                "UPDATE stream SET udp_forwarding=0, is_deleted=1, enabled=0 WHERE id=?",
+                udp_ids,
+            )
+    return removed
+
+
 async def handler(websocket, path=None):
     """
     Main WebSocket handler for remote clients.
     Handles authentication, port forwarding, conflict resolution, remote commands,
     and stream management requests.
+    Messages are small JSON text frames; the server is started with compression=None,
+    so frames arrive uncompressed.
     """
     peer = websocket.remote_address
     ws_info("[WS]", f"Client connected from {peer}")
     client_id = None
+    # Conexión SQLite perezosa, reutilizada por todos los mensajes de este cliente
+    db = None
     try:
         async for message in websocket:
-            try:
-                data_preview = json.loads(message)
-                data_preview = dict(data_preview)
-                if "token" in data_preview:
-                    data_preview["token"] = "***hidden***"
-                msg_log = json.dumps(data_preview)
-            except Exception:
-                msg_log = message
-            ws_info(
-                "[WS]",
-                f"Message received from {peer}: {msg_log} on {time.strftime('%Y-%m-%d %H:%M:%S')}",
-            )
+            # La vista previa solo se construye si el registro de mensajes está activo;
+            # la consola y el archivo de log ya añaden su propia marca de tiempo
+            if cfg.WS_LOG_MESSAGES:
+                if isinstance(message, bytes):
+                    message_text = message.decode("utf-8", "replace")
+                else:
+                    message_text = message
+                msg_log = _TOKEN_RE.sub('"token": "***hidden***"', message_text)
+                ws_info("[WS]", f"Message received from {peer}: {msg_log}")
 
             try:
                 data = json.loads(message)
@@ -97,37 +306,19 @@ async def handler(websocket, path=None):
 
                 # Validar token aquí y solo aquí
                 if not token or str(token).strip() != str(cfg.WS_TOKEN).strip():
-                    await websocket.send(
-                        json.dumps({"status": "error", "msg": "Invalid token"})
-                    )
+                    await websocket.send(_MSG_INVALID_TOKEN)
                     continue
 
                 # --- FIX: Si el mensaje solo tiene token, no requiere 'type' ---
-                if set(data.keys()) == {"token"}:
-                    await websocket.send(
-                        json.dumps(
-                            {
-                                "status": "ok",
-                                "msg": "Valid token, waiting for port data",
-                            }
-                        )
-                    )
+                if len(data) == 1 and "token" in data:
+                    await websocket.send(_MSG_TOKEN_OK)
                     continue
 
                 # --- NUEVO: Si no hay 'type' pero hay 'ports', asumir mensaje de puertos (compatibilidad vieja) ---
                 message_type = data.get("type")
 
-                # Delegar mensajes remote_ al handler remoto
-                if message_type and message_type.startswith("remote_"):
-                    await remote_message_handler.handle_server_message(data, websocket)
-                    continue
-
-                # Delegar mensajes client_ al handler de cliente
-                if message_type and message_type.startswith("client_"):
-                    await message_handler.handle_server_message(data, websocket)
-                    continue
-
                 # --- NEW: Update last_seen on ping messages ---
+                # Se comprueba primero por ser el mensaje más frecuente
                 if message_type == "ping":
                     # Find the client_id corresponding to this websocket
                     for cid, info in cfg.connected_clients.items():
@@ -136,42 +327,29 @@ async def handler(websocket, path=None):
                             client_id = cid
                             break
                     # Optionally: you can respond to the ping if you want
-                    await websocket.send(json.dumps({"status": "ok", "msg": "pong"}))
+                    await websocket.send(_MSG_PONG)
                     continue
 
+                if message_type:
+                    # Delegar mensajes remote_ al handler remoto
+                    if message_type.startswith("remote_"):
+                        await remote_message_handler.handle_server_message(
+                            data, websocket
+                        )
+                        continue
+
+                    # Delegar mensajes client_ al handler de cliente
+                    if message_type.startswith("client_"):
+                        await message_handler.handle_server_message(data, websocket)
+                        continue
+
                 # Handle server capabilities query
                 if message_type == "query_capabilities":
                     ws_info("[WS]", f"Server capabilities query from {peer}")
 
-                    # Check WireGuard availability
-                    wg_available = wg_tools.get_local_wg_ip("wg0") is not None
-                    wg_peer_ip = (
-                        wg_utils.get_peer_ip_for_client() if wg_available else None
-                    )
-
-                    capabilities = {
-                        "status": "ok",
-                        "server_capabilities": {
-                            "has_wireguard": wg_available,
-                            "wireguard_ip": (
-                                wg_tools.get_local_wg_ip("wg0")
-                                if wg_available
-                                else None
-                            ),
-                            "wireguard_peer_ip": wg_peer_ip,
-                            "conflict_resolution_server": not wg_available,  # Non-WG servers handle conflict resolution
-                            "port_forwarding_server": wg_available,  # WG servers handle port forwarding only
-                            "server_type": (
-                                "wireguard" if wg_available else "conflict_resolution"
-                            ),
-                        },
-                    }
-
-                    ws_info(
-                        "[WS]",
-                        f"Server type: {capabilities['server_capabilities']['server_type']}",
-                    )
-                    await websocket.send(json.dumps(capabilities))
+                    payload, server_type = _get_capabilities_payload()
+                    ws_info("[WS]", f"Server type: {server_type}")
+                    await websocket.send(payload)
                     continue
 
                 # Handle test connection from Control Panel
@@ -203,7 +381,7 @@ async def handler(websocket, path=None):
                     ws_info("[WS]", f"Ports pre-approved: {ports_pre_approved}")
 
                     # Check if this is a WireGuard server
-                    wg_mode = wg_tools.get_local_wg_ip("wg0") is not None
+                    wg_mode = _wg_ip() is not None
 
                     if not wg_mode:
                         # Conflict resolution server (non-WG): Handle conflict resolution
@@ -240,14 +418,14 @@ async def handler(websocket, path=None):
                             }
 
                         # Update client information
-                        port_set = set(
-                            (entry.get("port"), entry.get("protocol", "tcp"))
+                        port_set = {
+                            (port, entry.get("protocol", "tcp"))
                             for entry in ports
-                            if entry.get("port")
+                            if (port := entry.get("port"))
+                        }
+                        cfg.connected_clients[client_id].update(
+                            {"ports": port_set, "last_seen": time.time(), "ws": websocket}
                         )
-                        cfg.connected_clients[client_id]["ports"] = port_set
-                        cfg.connected_clients[client_id]["last_seen"] = time.time()
-                        cfg.connected_clients[client_id]["ws"] = websocket
 
                         # Process with conflict resolution
                         try:
@@ -308,43 +486,75 @@ async def handler(websocket, path=None):
                         # Process ports and create streams
                         new_entries_to_add = []
                         result_ports = []
+                        # Búsquedas de métodos cacheadas fuera del bucle por entrada
+                        add_entry = new_entries_to_add.append
+                        add_result = result_ports.append
+                        get = dict.get
 
                         for entry in ports:
                             # Permitir ambos formatos de clave: port/protocol y puerto/protocolo
-                            port = entry.get("port")
+                            port = get(entry, "port")
                             if port is None:
-                                port = entry.get("puerto")
-                            proto = entry.get("protocol")
+                                port = get(entry, "puerto")
+                            proto = get(entry, "protocol")
                             if proto is None:
-                                proto = entry.get("protocolo")
-                            incoming_port = entry.get("incoming_port", port)
-                            conflict_resolved = entry.get("conflict_resolved", False)
+                                proto = get(entry, "protocolo")
+                            incoming_port = get(entry, "incoming_port", port)
+                            conflict_resolved = get(entry, "conflict_resolved", False)
 
                             if port is None or proto is None:
                                 continue
 
                             # CRITICAL FIX: For WireGuard, if there is conflict resolution,
                             # use incoming_port for both incoming and forwarding
-                            if conflict_resolved and incoming_port != port:
-                                # WireGuard client connects directly to the alternate port
-                                forwarding_port = incoming_port
+                            # (the WireGuard client connects directly to the alternate port);
+                            # otherwise use the original port
+                            wg_conflict = conflict_resolved and incoming_port != port
+                            forwarding_port = incoming_port if wg_conflict else port
+
+                            # Puertos no numéricos del cliente: error solo para esa entrada
+                            try:
+                                incoming_port_int = int(incoming_port)
+                                forwarding_port_int = int(forwarding_port)
+                            except (TypeError, ValueError):
+                                ws_warning(
+                                    "[WS]",
+                                    f"Invalid WG port entry skipped: port={port!r}, incoming_port={incoming_port!r}",
+                                )
+                                add_result(
+                                    {
+                                        "puerto": port,
+                                        "protocolo": proto,
+                                        "incoming_port": incoming_port,
+                                        "updated": False,
+                                        "conflict_resolved": conflict_resolved,
+                                        "error": "invalid port",
+                                    }
+                                )
+                                continue
+
+                            if wg_conflict:
                                 ws_warning(
                                     "[WS]",
                                     f"WG conflict resolution: incoming={incoming_port} → {final_ip}:{forwarding_port} (original port: {port})",
                                 )
                             else:
-                                # No conflict, use the original port
-                                forwarding_port = port
                                 ws_info(
                                     "[WS]",
                                     f"WG normal: incoming={incoming_port} → {final_ip}:{forwarding_port}",
                                 )
 
-                            new_entries_to_add.append(
-                                (incoming_port, proto, final_ip, forwarding_port)
+                            # Tipos canónicos desde aquí: el diff contra SQLite compara sin conversiones
+                            add_entry(
+                                (
+                                    incoming_port_int,
+                                    proto,
+                                    str(final_ip),
+                                    forwarding_port_int,
+                                )
                             )
 
-                            result_ports.append(
+                            add_result(
                                 {
                                     "puerto": port,
                                     "protocolo": proto,
@@ -355,164 +565,109 @@ async def handler(websocket, path=None):
                                 }
                             )
 
+                        # --- NUEVO BLOQUE: Verificar si hay cambios reales ---
+                        # Consultar streams existentes para este cliente y comparar.
+                        # El diff arranca en un hilo antes del log para solapar ambos.
+                        if db is None:
+                            db = _open_db()
+                        # run_in_executor envía el trabajo al pool inmediatamente
+                        # (create_task no arrancaría hasta ceder el control al loop)
+                        loop = asyncio.get_running_loop()
+                        diff_task = loop.run_in_executor(
+                            None, _diff_streams, db, new_entries_to_add
+                        )
                         ws_info(
                             "[WS]",
                             f"Processing {len(new_entries_to_add)} pre-approved stream entries for WG database...",
                         )
-
-                        # --- NUEVO BLOQUE: Verificar si hay cambios reales ---
-                        # Consultar streams existentes para este cliente y comparar
-                        conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
-                        try:
-                            cur = conn.cursor()
-                            unchanged = []
-                            to_add = []
-                            for entry in new_entries_to_add:
-                                incoming_port, proto, ip_db, forwarding_port = entry
-                                cur.execute(
-                                    "SELECT forwarding_host, forwarding_port, tcp_forwarding, udp_forwarding FROM stream WHERE incoming_port=? AND is_deleted=0",
-                                    (incoming_port,),
-                                )
-                                row = cur.fetchone()
-                                if row:
-                                    fwd_host, fwd_port, tcp_f, udp_f = row
-                                    proto_tcp = proto == "tcp"
-                                    proto_udp = proto == "udp"
-                                    # Verifica si la configuración es idéntica
-                                    if (
-                                        str(fwd_host) == str(ip_db)
-                                        and int(fwd_port) == int(forwarding_port)
-                                        and (
-                                            (proto_tcp and tcp_f)
-                                            or (proto_udp and udp_f)
-                                        )
-                                    ):
-                                        unchanged.append(entry)
-                                    else:
-                                        to_add.append(entry)
-                                else:
-                                    to_add.append(entry)
-                            # Si todos los streams ya existen y no hay cambios, responde y no recarga NPM
-                            if len(to_add) == 0:
-                                ws_info(
-                                    "[WS]",
-                                    "Todos los streams ya existen y no requieren actualización. No se sincroniza ni recarga NPM.",
-                                )
-                                await websocket.send(
-                                    json.dumps(
-                                        {
-                                            "status": "ok",
-                                            "msg": "No hay cambios en los streams. Todos ya existen y están sincronizados.",
-                                            "resultados": result_ports,
-                                        }
-                                    )
+                        to_add = await diff_task
+                        # Si todos los streams ya existen y no hay cambios, responde y no recarga NPM
+                        if len(to_add) == 0:
+                            ws_info(
+                                "[WS]",
+                                "Todos los streams ya existen y no requieren actualización. No se sincroniza ni recarga NPM.",
+                            )
+                            await websocket.send(
+                                json.dumps(
+                                    {
+                                        "status": "ok",
+                                        "msg": "No hay cambios en los streams. Todos ya existen y están sincronizados.",
+                                        "resultados": result_ports,
+                                    }
                                 )
-                                continue
-                            # Si hay streams nuevos o que requieren actualización, solo procesa esos
-                            new_entries_to_add = to_add
-                        finally:
-                            conn.close()
+                            )
+                            continue
+                        # Si hay streams nuevos o que requieren actualización, solo procesa esos
+                        new_entries_to_add = to_add
                         # --- FIN BLOQUE NUEVO ---
 
-                        if new_entries_to_add:
-                            try:
-                                sc.add_streams_sqlite_with_ip_extended(
-                                    new_entries_to_add
-                                )
-                                # Importar scdb aquí para evitar error de variable local no asociada
-                                from Streams import stream_creation_db as scdb
-
-                                scdb.sync_streams_conf_with_sqlite()
-
-                                # --- CHANGE: Add log before reloading NPM ---
-                                ws_warning(
-                                    "[WS]", "Reloading NPM due to stream change..."
-                                )
-                                npmh.reload_npm()
-                                # ----------------------------
-
-                                ws_info(
-                                    "[WS]",
-                                    f"Successfully processed {len(new_entries_to_add)} WG streams",
-                                )
-
-                            except Exception as e:
-                                ws_error("[WS]", f"Error processing WG streams: {e}")
-                                await websocket.send(
-                                    json.dumps(
-                                        {
-                                            "status": "error",
-                                            "msg": f"Error processing streams: {str(e)}",
-                                        }
-                                    )
-                                )
-                                continue
-
-                        # Send successful response
+                        # La escritura en SQLite corre en un hilo mientras se prepara la respuesta
+                        write_task = loop.run_in_executor(
+                            None,
+                            functools.partial(
+                                sc.add_streams_sqlite_with_ip_extended,
+                                new_entries_to_add,
+                                sync=False,
+                            ),
+                        )
                         result = {
                             "status": "ok",
                             "msg": f"WG Streams synchronized for {ip}. {len(new_entries_to_add)} pre-approved entries processed.",
                             "resultados": result_ports,
                         }
+                        try:
+                            await write_task
+                            # --- CHANGE: Add log before reloading NPM ---
+                            ws_warning("[WS]", "Reloading NPM due to stream change...")
+                            scdb.request_npm_reload()
+                            # ----------------------------
+
+                            ws_info(
+                                "[WS]",
+                                f"Successfully processed {len(new_entries_to_add)} WG streams",
+                            )
+
+                        except Exception as e:
+                            ws_error("[WS]", f"Error processing WG streams: {e}")
+                            await websocket.send(
+                                json.dumps(
+                                    {
+                                        "status": "error",
+                                        "msg": f"Error processing streams: {str(e)}",
+                                    }
+                                )
+                            )
+                            continue
+
+                        # Send successful response
                         await websocket.send(json.dumps(result))
 
                 # Handle removal of inactive ports
                 elif message_type == "remove_ports":
                     remove_ports = data["remove_ports"]
-                    conn = sqlite3.connect(cfg.SQLITE_DB_PATH)
-                    try:
-                        cur = conn.cursor()
-                        removed = []
-                        for entry in remove_ports:
-                            port = entry.get("puerto")
-                            proto = entry.get("protocolo", "tcp")
-                            # Set is_deleted=1 and enabled=0 for the matching stream and protocol
-                            cur.execute(
-                                "SELECT id, tcp_forwarding, udp_forwarding FROM stream WHERE incoming_port=? AND is_deleted=0",
-                                (port,),
-                            )
-                            row = cur.fetchone()
-                            if row:
-                                stream_id, tcp_f, udp_f = row
-                                if proto == "tcp" and tcp_f:
-                                    cur.execute(
-                                        "UPDATE stream SET tcp_forwarding=0, is_deleted=1, enabled=0 WHERE id=?",
-                                        (stream_id,),
-                                    )
-                                    removed.append(f"{port}/tcp")
-                                elif proto == "udp" and udp_f:
-                                    cur.execute(
-                                        "UPDATE stream SET udp_forwarding=0, is_deleted=1, enabled=0 WHERE id=?",
-                                        (stream_id,),
-                                    )
-                                    removed.append(f"{port}/udp")
-                        conn.commit()
-                        if removed:
-                            ws_warning(
-                                "[WS]",
-                                f"Removed inactive ports by client request: {removed}",
-                            )
-                            # --- NEW: Synchronize configuration files and reload NGINX/NPM ---
-                            from Streams import stream_creation_db as scdb
-                            from npm.npm_handler import reload_npm
-
-                            scdb.sync_streams_conf_with_sqlite()
-                            ws_info("[WS]", "Reloading NPM due to port removal...")
-                            reload_npm()
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "status": "ok",
-                                    "msg": f"Removed inactive ports: {removed}",
-                                }
-                            )
+                    if db is None:
+                        db = _open_db()
+                    removed = await asyncio.to_thread(_remove_streams, db, remove_ports)
+                    if removed:
+                        ws_warning(
+                            "[WS]",
+                            f"Removed inactive ports by client request: {removed}",
                         )
-                    finally:
-                        conn.close()
+                        # --- NEW: Synchronize configuration files and reload NGINX/NPM ---
+                        ws_info("[WS]", "Reloading NPM due to port removal...")
+                        scdb.request_npm_reload()
+                    await websocket.send(
+                        json.dumps(
+                            {
+                                "status": "ok",
+                                "msg": f"Removed inactive ports: {removed}",
+                            }
+                        )
+                    )
                     continue
 
                 # --- PROCESAR PUERTOS REMOTOS PENDIENTES (solo en servidores CR) ---
-                wg_mode = wg_tools.get_local_wg_ip("wg0") is not None
+                wg_mode = _wg_ip() is not None
                 if not wg_mode:
                     # Importar aquí para evitar ciclos de importación
                     from Core import remote_message_handler as rmh
@@ -543,7 +698,8 @@ async def handler(websocket, path=None):
                         from Streams import stream_creation
 
                         stream_creation.add_streams_sqlite_with_ip_extended(
-                            [(port, proto, forwarding_host, forwarding_port)]
+                            [(port, proto, forwarding_host, forwarding_port)],
+                            sync=False,
                         )
                         processed += 1
                         ws_info(
@@ -552,10 +708,7 @@ async def handler(websocket, path=None):
                         )
                     if processed:
                         # Sincronizar la configuración y recargar NPM solo si hubo cambios
-                        from Streams import stream_creation_db as scdb
-
-                        scdb.sync_streams_conf_with_sqlite()
-                        npmh.reload_npm()
+                        scdb.request_npm_reload()
                         ws_info(
                             "[REMOTE]",
                             f"{processed} streams remotos procesados y sincronizados.",
@@ -586,6 +739,8 @@ async def handler(websocket, path=None):
     except websockets.ConnectionClosed:
         ws_info("[WS]", f"Client {peer} disconnected")
     finally:
+        if db is not None:
+            db.close()
         if client_id and client_id in cfg.connected_clients:
             del cfg.connected_clients[client_id]
-            await ch.notify_clients_of_conflicts_and_assignments()
+            ch.schedule_conflict_notification()